@@ -0,0 +1,44 @@
+# -*- encoding: utf-8 -*-
+
+"""Benchmarks for drunken_child_in_the_fog.
+
+Every module has a ``run()`` function returning a dict of results and can be
+executed on its own, for example::
+
+    python -m benchmarks.memory
+
+To run every benchmark and save results for comparing them between
+releases::
+
+    python -m benchmarks -o 0.4.0.json
+    python -m benchmarks --compare 0.3.1.json 0.4.0.json
+"""
+
+from timeit import default_timer as timer
+
+
+def timed(fun, *args, **kw):
+    """Return wall time of fun(*args, **kw) in seconds. """
+    start = timer()
+    fun(*args, **kw)
+    return timer() - start
+
+
+def best_of(repeat, fun, *args, **kw):
+    """Return the shortest wall time of repeat calls of fun. """
+    return min(timed(fun, *args, **kw) for _ in range(repeat))
+
+
+def peak_memory(fun, *args, **kw):
+    """Return peak memory allocated by fun(*args, **kw), in bytes. Requires
+    Python 3.4 or newer. """
+    import tracemalloc
+
+    # Peak is counted from the start of tracing.
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        fun(*args, **kw)
+        return tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,68 @@
+# -*- encoding: utf-8 -*-
+
+"""Run every benchmark and print results as JSON, or compare two result
+files. """
+
+import argparse
+import datetime
+import importlib
+import json
+import platform
+import sys
+
+import drunken_child_in_the_fog
+
+MODULES = ("parsing", "sorting", "defrag", "queries", "memory")
+
+
+def run(modules=MODULES):
+    results = {
+        "version": drunken_child_in_the_fog.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": datetime.datetime.now().isoformat(),
+        "results": {},
+    }
+    for name in modules:
+        module = importlib.import_module("benchmarks.%s" % name)
+        for key, value in module.run().items():
+            results["results"]["%s.%s" % (name, key)] = value
+    return results
+
+
+def compare(old, new, output):
+    """Write a table with results present in both files and their ratio. """
+    old = old["results"]
+    new = new["results"]
+    width = max(len(key) for key in new)
+    for key in sorted(set(old) & set(new)):
+        ratio = new[key] / old[key] if old[key] else float("inf")
+        output.write("%-*s %12.6g %12.6g %8.2fx\n" % (
+            width, key, old[key], new[key], ratio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("-o", "--output", help="save results to a file")
+    parser.add_argument("-m", "--module", action="append", choices=MODULES,
+                        help="run only this benchmark module")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as old, open(args.compare[1]) as new:
+            compare(json.load(old), json.load(new), sys.stdout)
+        return 0
+
+    data = json.dumps(run(args.module or MODULES), indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(data)
+    else:
+        print(data)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# -*- encoding: utf-8 -*-
+
+"""Time of :meth:`.Page.defrag_lines` on a page with a dense, ruled grid,
+where every line is split in one segment per cell. """
+
+import json
+import random
+
+from benchmarks import timed
+from drunken_child_in_the_fog.core import Page, HORIZONTAL_LINE, \
+    VERTICAL_LINE
+
+GRIDS = (20, 50, 100)
+
+# The previous, pairwise implementation is timed only for small grids.
+LEGACY_MAX_GRID = 20
+
+
+def make_page(cells, cell_size=5, seed=0):
+    """Return a page with a grid of cells x cells, with every line split in
+    segments one cell long, in random order. """
+    size = cells * cell_size
+    segments = []
+    for no in range(cells + 1):
+        fixed = no * cell_size
+        for cell in range(cells):
+            start = cell * cell_size
+            end = start + cell_size
+            segments.append((start, fixed, end, fixed, HORIZONTAL_LINE))
+            segments.append((fixed, start, fixed, end, VERTICAL_LINE))
+    random.Random(seed).shuffle(segments)
+
+    page = Page(size, size, None)
+    for segment in segments:
+        page.add_element(*segment)
+    page.sort_elements()
+    return page
+
+
+def legacy_defrag_lines(page):
+    remove = []
+    lines = page.lines().all()
+
+    for line in lines:
+        if line in remove:
+            continue
+
+        for other_line in lines:
+            if other_line in remove:
+                continue
+            if line == other_line:
+                continue
+            if line.kind == other_line.kind:
+                if other_line.x1 == line.x2 and other_line.y1 == line.y2:
+                    line.x2 = other_line.x2
+                    line.y2 = other_line.y2
+                    remove.append(other_line)
+
+    for line in remove:
+        page.elements.remove(line)
+
+
+def run():
+    results = {}
+    for cells in GRIDS:
+        page = make_page(cells)
+        segments = len(page.elements)
+        results["defrag_%dx%d_s" % (cells, cells)] = timed(
+            Page.defrag_lines, page)
+        assert len(page.elements) == 2 * (cells + 1), len(page.elements)
+        results["defrag_%dx%d_segments" % (cells, cells)] = segments
+
+        if cells <= LEGACY_MAX_GRID:
+            results["legacy_defrag_%dx%d_s" % (cells, cells)] = timed(
+                legacy_defrag_lines, make_page(cells))
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2, sort_keys=True))
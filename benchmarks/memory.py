@@ -0,0 +1,51 @@
+# -*- encoding: utf-8 -*-
+
+"""Memory used by a single :class:`.Element`, compared with the previous,
+``__dict__`` based implementation. """
+
+import json
+import tracemalloc
+
+from drunken_child_in_the_fog.core import Element, Page, HORIZONTAL_LINE
+
+COUNT = 100000
+
+
+class LegacyElement:
+    """Element as it was before __slots__ were introduced. """
+
+    def __init__(self, page, x1, y1, x2, y2, text):
+        self.page = page
+        self.x1 = x1
+        self.y1 = self.page.height - y2
+        self.x2 = x2
+        self.y2 = self.page.height - y1
+        self.text = text
+
+
+def bytes_per_element(klass, text):
+    page = Page(612, 792, None)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        elements = [klass(page, float(no % 500), float(no % 700),
+                          float(no % 500 + 10), float(no % 700 + 10), text)
+                    for no in range(COUNT)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(elements) == COUNT
+    return (after - before) / float(COUNT)
+
+
+def run():
+    results = {}
+    for name, text in [("text", "Total"), ("line", HORIZONTAL_LINE)]:
+        results["%s_bytes_before" % name] = bytes_per_element(
+            LegacyElement, text)
+        results["%s_bytes_after" % name] = bytes_per_element(Element, text)
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2, sort_keys=True))
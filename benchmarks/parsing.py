@@ -0,0 +1,71 @@
+# -*- encoding: utf-8 -*-
+
+"""Time and peak memory of parsing a synthetic PDF file. """
+
+import json
+import os
+from io import BytesIO
+
+from benchmarks import timed, peak_memory
+from benchmarks.synthetic import make_pdf
+from drunken_child_in_the_fog.core import DrunkenChildInTheFog, Extractor
+from drunken_child_in_the_fog.export import JSONLinesWriter, export
+
+PAGES = 20
+
+# Number of single page files in a batch
+BATCH = 50
+
+
+def get_document(data, **kw):
+    return DrunkenChildInTheFog(BytesIO(data)).get_document(**kw)
+
+
+def no_layout_analysis(data):
+    parser = DrunkenChildInTheFog(BytesIO(data), layout_analysis=False)
+    return parser.get_document()
+
+
+def batch(files, extractor=None):
+    for data in files:
+        if extractor is None:
+            DrunkenChildInTheFog(data).get_document()
+        else:
+            extractor.get_document(data)
+
+
+def iter_pages(data):
+    for page in DrunkenChildInTheFog(BytesIO(data)).iter_pages():
+        pass
+
+
+def export_jsonl(data):
+    with open(os.devnull, "w") as output:
+        export(BytesIO(data), JSONLinesWriter(output))
+
+
+def first_page(data):
+    next(DrunkenChildInTheFog(BytesIO(data)).iter_pages())
+
+
+def run():
+    data = make_pdf(PAGES)
+    files = [make_pdf(1, text_lines=10, rows=3, columns=3, seed=seed)
+             for seed in range(BATCH)]
+    return {
+        "batch_s": timed(batch, files),
+        "batch_extractor_s": timed(batch, files, Extractor()),
+        "get_document_s": timed(get_document, data),
+        "get_document_peak_bytes": peak_memory(get_document, data),
+        "get_document_4_workers_s": timed(get_document, data, workers=4),
+        "get_document_no_layout_analysis_s": timed(no_layout_analysis, data),
+        "iter_pages_s": timed(iter_pages, data),
+        "iter_pages_peak_bytes": peak_memory(iter_pages, data),
+        "first_page_s": timed(first_page, data),
+        "export_jsonl_s": timed(export_jsonl, data),
+        "export_jsonl_peak_bytes": peak_memory(export_jsonl, data),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2, sort_keys=True))
@@ -0,0 +1,124 @@
+# -*- encoding: utf-8 -*-
+
+"""Time of queries on a parsed synthetic document. """
+
+import json
+import random
+from io import BytesIO
+
+from benchmarks import best_of
+from benchmarks.synthetic import make_pdf, WORDS
+from drunken_child_in_the_fog.core import DrunkenChildInTheFog, BoxQuery, \
+    ElementSet
+from drunken_child_in_the_fog.search import TextMatcher
+from drunken_child_in_the_fog.template import Template, Region, Anchor
+
+PAGES = 20
+BOXES = 200
+REPEAT = 3
+LABELS = 1000
+# Number of regions and of anchors of a template
+FIELDS = 20
+
+
+def parse():
+    data = make_pdf(PAGES)
+    return DrunkenChildInTheFog(BytesIO(data)).get_document()
+
+
+def boxes(page, count=BOXES, seed=0):
+    rnd = random.Random(seed)
+    ret = []
+    for _ in range(count):
+        x1 = rnd.uniform(0, page.width - 100)
+        y1 = rnd.uniform(0, page.height - 30)
+        ret.append(BoxQuery(x1, y1, x1 + 100, y1 + 30))
+    return ret
+
+
+def labels(count=LABELS, seed=0):
+    rnd = random.Random(seed)
+    return ["%s %s %d" % (rnd.choice(WORDS), rnd.choice(WORDS),
+                          rnd.randint(0, 99)) for _ in range(count)]
+
+
+def run():
+    document = parse()
+    pages = document.get_pages()
+    page = pages[0]
+    queries = boxes(page)
+    plain = ElementSet(page.elements)
+
+    def query_all(elements):
+        for name in ("lines", "vertical", "horizontal", "text"):
+            getattr(elements, name)().count()
+
+    def inside(elements, f):
+        for box in queries:
+            elements.inside(box, f).count()
+
+    def containing_text():
+        everything = document.everything()
+        for word in WORDS:
+            everything.containing_text(word).count()
+
+    patterns = labels()
+
+    def containing_labels():
+        everything = document.everything()
+        for pattern in patterns:
+            everything.containing_text(pattern).count()
+
+    def search_many(matcher):
+        document.search_many(matcher)
+
+    def right_of(elements):
+        for element in page.elements[::10]:
+            elements.right_of(element).all()[:1]
+            elements.nearest(element, 3, "below").all()
+
+    regions = queries[:FIELDS]
+    anchors = patterns[:FIELDS]
+    template = Template(
+        [Region("region%d" % no, box) for no, box in enumerate(regions)] +
+        [Anchor("anchor%d" % no, word) for no, word in enumerate(anchors)])
+
+    def fields():
+        for page in pages:
+            everything = page.everything()
+            for box in regions:
+                everything.inside(box).text().all()
+            for word in anchors:
+                for anchor in everything.containing_text(word):
+                    everything.text().nearest(anchor, 1, "right").all()
+
+    def tables():
+        for page in pages:
+            page.tables()
+
+    results = {
+        "everything_s": best_of(REPEAT, document.everything),
+        "filters_s": best_of(REPEAT, query_all, document.everything()),
+        "containing_text_s": best_of(REPEAT, containing_text),
+        "tables_s": best_of(REPEAT, tables),
+        "containing_labels_s": best_of(1, containing_labels),
+        "search_many_s": best_of(REPEAT, search_many, TextMatcher(patterns)),
+        "search_many_regex_s": best_of(
+            REPEAT, search_many, TextMatcher(patterns, regex=True)),
+        "fields_s": best_of(REPEAT, fields),
+        "template_s": best_of(REPEAT, template.apply, document),
+    }
+    results["page_right_of_s"] = best_of(REPEAT, right_of, page.everything())
+    results["scan_right_of_s"] = best_of(REPEAT, right_of, plain)
+    for f in ("starts_inside", "ends_inside", "whole_inside"):
+        results["page_%s_s" % f] = best_of(REPEAT, inside, page.everything(),
+                                           f)
+        results["scan_%s_s" % f] = best_of(REPEAT, inside, plain, f)
+
+    document.build_text_index()
+    results["indexed_containing_text_s"] = best_of(REPEAT, containing_text)
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2, sort_keys=True))
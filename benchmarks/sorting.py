@@ -0,0 +1,41 @@
+# -*- encoding: utf-8 -*-
+
+"""Time of :meth:`.Document.sort` for synthetic documents of growing length.
+With constant-time :meth:`.Page.position_in_document`, time per element
+should stay roughly the same for every document length. """
+
+import json
+import random
+
+from benchmarks import timed
+from drunken_child_in_the_fog.core import Document
+
+PAGES = (1250, 2500, 5000)
+ELEMENTS_PER_PAGE = 50
+
+
+def make_document(pages, elements_per_page=ELEMENTS_PER_PAGE, seed=0):
+    rnd = random.Random(seed)
+    document = Document()
+    for _ in range(pages):
+        page = document.add_page(612, 792)
+        for _ in range(elements_per_page):
+            x = rnd.uniform(0, 550)
+            y = rnd.uniform(0, 780)
+            page.add_element(x, y, x + 50, y + 10, "text")
+    return document
+
+
+def run():
+    results = {}
+    for pages in PAGES:
+        document = make_document(pages)
+        elapsed = timed(document.sort)
+        results["sort_%d_pages_s" % pages] = elapsed
+        results["sort_%d_pages_us_per_element" % pages] = \
+            elapsed * 1e6 / (pages * ELEMENTS_PER_PAGE)
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2, sort_keys=True))
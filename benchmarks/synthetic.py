@@ -0,0 +1,147 @@
+# -*- encoding: utf-8 -*-
+
+"""Deterministic generator of synthetic PDF files.
+
+Every page has a few paragraphs of dense text, a ruled grid drawn with one
+line segment per cell (so :meth:`.Page.defrag_lines` has work to do) and a
+form XObject with another, nested form XObject inside, which pdfminer reports
+as nested ``LTFigure`` objects. ::
+
+    python -m benchmarks.synthetic 100 > synthetic.pdf
+"""
+
+import random
+import sys
+
+WORDS = ("invoice total net gross amount quantity price tax vat date "
+         "number customer address payment due balance discount item "
+         "description unit code account reference order").split()
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text(x, y, text, size=9):
+    return "BT /F1 %d Tf %.2f %.2f Td (%s) Tj ET" % (size, x, y,
+                                                     _escape(text))
+
+
+def _words(rnd, count):
+    return " ".join(rnd.choice(WORDS) for _ in range(count))
+
+
+def page_content(rnd, text_lines=40, rows=20, columns=5):
+    """Return content stream of a single page. """
+    ops = []
+
+    # Dense text, in the upper part of the page
+    y = PAGE_HEIGHT - 40
+    for _ in range(text_lines):
+        ops.append(_text(40, y, _words(rnd, 12)))
+        y -= 11
+
+    # Ruled grid, every line split in one segment per cell
+    top = y - 10
+    cell_width = (PAGE_WIDTH - 80) / float(columns)
+    cell_height = min(14.0, (top - 60) / float(rows))
+    ops.append("0.5 w")
+    for row in range(rows + 1):
+        line_y = top - row * cell_height
+        for column in range(columns):
+            x1 = 40 + column * cell_width
+            ops.append("%.2f %.2f m %.2f %.2f l S" % (
+                x1, line_y, x1 + cell_width, line_y))
+    for column in range(columns + 1):
+        line_x = 40 + column * cell_width
+        for row in range(rows):
+            y1 = top - row * cell_height
+            ops.append("%.2f %.2f m %.2f %.2f l S" % (
+                line_x, y1, line_x, y1 - cell_height))
+    for row in range(rows):
+        for column in range(columns):
+            label = "%s %d" % (rnd.choice(WORDS), rnd.randint(1, 999))
+            ops.append(_text(42 + column * cell_width,
+                             top - (row + 1) * cell_height + 3, label,
+                             size=7))
+
+    # Nested figures
+    ops.append("/Fx1 Do")
+    return "\n".join(ops).encode("latin-1")
+
+
+def make_pdf(pages=10, text_lines=40, rows=20, columns=5, seed=0):
+    """Return bytes of a synthetic PDF file. """
+    rnd = random.Random(seed)
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    def stream(dictionary, data):
+        return (b"<< " + dictionary + b" /Length " +
+                str(len(data)).encode("ascii") + b" >>\nstream\n" + data +
+                b"\nendstream")
+
+    catalog = add(None)
+    pages_obj = add(None)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+               b"/Encoding /WinAnsiEncoding >>")
+    fonts = b"/Font << /F1 " + str(font).encode("ascii") + b" 0 R >>"
+    inner = add(stream(
+        b"/Type /XObject /Subtype /Form /BBox [0 0 612 792] "
+        b"/Resources << " + fonts + b" >>",
+        (_text(420, 40, "nested figure text", size=6) +
+         "\n420 36 m 572 36 l S").encode("latin-1")))
+    outer = add(stream(
+        b"/Type /XObject /Subtype /Form /BBox [0 0 612 792] "
+        b"/Resources << " + fonts + b" /XObject << /Fx2 " +
+        str(inner).encode("ascii") + b" 0 R >> >>",
+        (_text(40, 40, "figure caption, page footer", size=6) +
+         "\n40 36 m 400 36 l S\n/Fx2 Do").encode("latin-1")))
+
+    kids = []
+    for _ in range(pages):
+        contents = add(stream(b"", page_content(
+            rnd, text_lines, rows, columns)))
+        kids.append(add(
+            b"<< /Type /Page /Parent " + str(pages_obj).encode("ascii") +
+            b" 0 R /MediaBox [0 0 612 792] /Resources << " + fonts +
+            b" /XObject << /Fx1 " +
+            str(outer).encode("ascii") + b" 0 R >> >> /Contents " +
+            str(contents).encode("ascii") + b" 0 R >>"))
+
+    objects[catalog - 1] = (b"<< /Type /Catalog /Pages " +
+                            str(pages_obj).encode("ascii") + b" 0 R >>")
+    objects[pages_obj - 1] = (
+        b"<< /Type /Pages /Kids [" +
+        b" ".join(str(kid).encode("ascii") + b" 0 R" for kid in kids) +
+        b"] /Count " + str(pages).encode("ascii") + b" >>")
+
+    out = [b"%PDF-1.4\n"]
+    offsets = []
+    position = len(out[0])
+    for no, body in enumerate(objects, 1):
+        offsets.append(position)
+        chunk = str(no).encode("ascii") + b" 0 obj\n" + body + b"\nendobj\n"
+        out.append(chunk)
+        position += len(chunk)
+
+    xref = [b"xref\n0 " + str(len(objects) + 1).encode("ascii") + b"\n",
+            b"0000000000 65535 f \n"]
+    for offset in offsets:
+        xref.append(("%010d 00000 n \n" % offset).encode("ascii"))
+    out.extend(xref)
+    size = str(len(objects) + 1).encode("ascii")
+    out.append(b"trailer\n<< /Size " + size + b" /Root 1 0 R >>\nstartxref\n" +
+               str(position).encode("ascii") + b"\n%%EOF\n")
+    return b"".join(out)
+
+
+if __name__ == "__main__":
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    getattr(sys.stdout, "buffer", sys.stdout).write(make_pdf(pages))
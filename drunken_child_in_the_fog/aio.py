@@ -0,0 +1,294 @@
+# -*- encoding: utf-8 -*-
+
+"""asyncio API. Documents are parsed by an executor, so the event loop is not
+blocked. Requires Python 3.6 or newer.
+
+>>> document = await aparse(open("file.pdf", "rb"))
+>>> async for page in aiter_pages(open("file.pdf", "rb")):
+...     page.containing_text("Total")
+
+To limit the number of documents parsed at the same time, share a single
+:class:`.AsyncParser`:
+
+>>> parser = AsyncParser(executor=ProcessPoolExecutor(4), max_documents=8)
+>>> document = await parser.parse(fp)
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from drunken_child_in_the_fog.core import DrunkenChildInTheFog, Document, \
+    Page, _parse_pages, _sort_page, _worker_source
+
+#: Number of pages parsed by a single task of a process executor
+PAGES_PER_TASK = 8
+
+
+class _Cancelled(Exception):
+    """Raised in the executor, to stop parsing a cancelled document. """
+    pass
+
+
+class _NoLimit:
+
+    async def __aenter__(self):
+        pass
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+def _count_pages(source):
+    with DrunkenChildInTheFog(source) as parser:
+        return parser.count_pages()
+
+
+def _remove_when_done(path, tasks):
+    """Remove a temporary file once every one of concurrent.futures tasks
+    is done. """
+    pending = [len(tasks)]
+    lock = threading.Lock()
+
+    def done(task):
+        with lock:
+            pending[0] -= 1
+            last = pending[0] == 0
+        if last:
+            os.remove(path)
+
+    if not tasks:
+        os.remove(path)
+    for task in tasks:
+        task.add_done_callback(done)
+
+
+def _discard_source(future):
+    """Remove the temporary file made by a future of _worker_source, which
+    is not used. """
+    if future.cancelled() or future.exception() is not None:
+        return
+    source, temporary = future.result()
+    if temporary:
+        _get_running_loop().run_in_executor(None, os.remove, source)
+
+
+async def _wait_done(future):
+    """Wait until an executor future is done, ignoring its result. """
+    if not future.done():
+        await asyncio.wait([future])
+    if not future.cancelled():
+        future.exception()
+
+
+def _get_running_loop():
+    # asyncio.get_running_loop is new in Python 3.7.
+    get_loop = getattr(asyncio, "get_running_loop", asyncio.get_event_loop)
+    return get_loop()
+
+
+class AsyncParser:
+    """Parses documents with an executor. Every :class:`.AsyncParser` should
+    be used with a single event loop.
+
+    With a thread executor (the default executor of the event loop, if None)
+    pages are parsed one after another, by :class:`.DrunkenChildInTheFog`.
+    With a ProcessPoolExecutor, every task parses a few pages and the
+    pages of a single document are parsed in parallel; worker processes open
+    the file by its path, like for :meth:`.DrunkenChildInTheFog.get_document`
+    with workers, so files in memory are written to a temporary file first.
+    Stats collected by workers are merged into stats given in kw.
+
+    An extractor given in kw is used by every document, so it requires
+    max_documents=1 and can not be used with a ProcessPoolExecutor.
+
+    If the awaiting task is cancelled, parsing stops before the next page.
+    A page being parsed at that moment can not be interrupted; the document
+    is counted in max_documents until it is done.
+
+    :param executor: concurrent.futures executor
+    :param max_documents: if given, at most that many documents are parsed at
+        the same time, others wait
+    :param kw: passed to :class:`.DrunkenChildInTheFog`, like char_margin
+    """
+
+    def __init__(self, executor=None, max_documents=None, **kw):
+        if kw.get("extractor") is not None:
+            if isinstance(executor, ProcessPoolExecutor):
+                raise ValueError(
+                    "extractor can not be used by other processes")
+            if max_documents != 1:
+                raise ValueError(
+                    "extractor can not be shared by documents parsed at the "
+                    "same time, use max_documents=1")
+        self.executor = executor
+        self.max_documents = max_documents
+        self.kw = kw
+        self._semaphore = None
+
+    def _limit(self):
+        if self.max_documents is None:
+            return _NoLimit()
+        if self._semaphore is None:
+            # Created lazily, in the event loop it will be used with.
+            self._semaphore = asyncio.Semaphore(self.max_documents)
+        return self._semaphore
+
+    def _run(self, function, *args):
+        loop = _get_running_loop()
+        return loop.run_in_executor(self.executor, function, *args)
+
+    @property
+    def _processes(self):
+        return isinstance(self.executor, ProcessPoolExecutor)
+
+    def _parser(self, fp, stop):
+        """Return a :class:`.DrunkenChildInTheFog` and a predicate raising
+        :class:`._Cancelled` once stop is set. """
+        def predicate(no, page):
+            if stop.is_set():
+                raise _Cancelled
+            return True
+        return DrunkenChildInTheFog(fp, **self.kw), predicate
+
+    def _get_document(self, fp, stop):
+        parser, predicate = self._parser(fp, stop)
+        with parser:
+            return parser.get_document(predicate=predicate)
+
+    def _iter_pages(self, fp, stop):
+        parser, predicate = self._parser(fp, stop)
+        with parser:
+            for page in parser.iter_pages(predicate=predicate):
+                yield page
+
+    async def parse(self, fp):
+        """Parse every page and return a sorted :class:`.Document`. """
+        async with self._limit():
+            if self._processes:
+                document = Document()
+                raw_pages = self._iter_raw_pages(fp)
+                try:
+                    async for no, raw_page in raw_pages:
+                        width, height, elements = raw_page
+                        page = document.add_page(width, height)
+                        for elem in elements:
+                            page.add_element(*elem)
+                        _sort_page(no, page, self.kw.get("stats"))
+                finally:
+                    await raw_pages.aclose()
+                return document
+
+            stop = threading.Event()
+            # Shielded, so a cancelled document keeps its slot until the
+            # executor is done with it.
+            future = self._run(self._get_document, fp, stop)
+            try:
+                return await asyncio.shield(future)
+            finally:
+                stop.set()
+                await _wait_done(future)
+
+    async def iter_pages(self, fp):
+        """Yield sorted :class:`.Page` objects as soon as they are parsed,
+        like :meth:`.DrunkenChildInTheFog.iter_pages`. """
+        async with self._limit():
+            if self._processes:
+                offset = 0
+                # Closed explicitly, so tasks of a document left early are
+                # cancelled right away.
+                raw_pages = self._iter_raw_pages(fp)
+                try:
+                    async for no, raw_page in raw_pages:
+                        width, height, elements = raw_page
+                        page = Page(width, height, None, offset=offset,
+                                    number=no + 1)
+                        for elem in elements:
+                            page.add_element(*elem)
+                        _sort_page(no, page, self.kw.get("stats"))
+                        offset += page.size()
+                        yield page
+                finally:
+                    await raw_pages.aclose()
+                return
+
+            stop = threading.Event()
+            step = None
+            try:
+                # Opening the file (and parsing its cross-reference table)
+                # happens in the executor, when the first page is requested.
+                pages = self._iter_pages(fp, stop)
+                while True:
+                    step = self._run(next, pages, None)
+                    page = await asyncio.shield(step)
+                    if page is None:
+                        break
+                    yield page
+            finally:
+                stop.set()
+                if step is not None:
+                    # Stops before the next page.
+                    await _wait_done(step)
+                pages.close()
+
+    async def _iter_raw_pages(self, fp):
+        """Yield (number, raw page) tuples, parsed by a process executor.
+        Pages are built in the event loop, which is cheap compared to
+        parsing them. """
+        # Files in memory are written in a thread, not in the event loop.
+        loop = _get_running_loop()
+        prepared = loop.run_in_executor(None, _worker_source, fp)
+        try:
+            source, temporary = await asyncio.shield(prepared)
+        except asyncio.CancelledError:
+            prepared.add_done_callback(_discard_source)
+            raise
+        char_margin = self.kw.get("char_margin", 1)
+        layout_analysis = self.kw.get("layout_analysis", True)
+        stats = self.kw.get("stats")
+
+        # Tasks of the executor, which may still read the file after futures
+        # of the event loop were cancelled
+        tasks = []
+
+        def submit(function, *args):
+            task = self.executor.submit(function, *args)
+            tasks.append(task)
+            return asyncio.wrap_future(task)
+
+        futures = []
+        try:
+            count = await submit(_count_pages, source)
+            for start in range(0, count, PAGES_PER_TASK):
+                stop = min(start + PAGES_PER_TASK, count)
+                indices = list(range(start, stop))
+                futures.append(submit(_parse_pages, (
+                    source, char_margin, layout_analysis, indices,
+                    stats is not None)))
+
+            for future in futures:
+                raw_pages, page_stats = await future
+                if page_stats is not None:
+                    stats.merge(page_stats)
+                for item in raw_pages:
+                    yield item
+        finally:
+            # Pending tasks of a cancelled document are not run at all.
+            for future in futures:
+                future.cancel()
+            if temporary:
+                await loop.run_in_executor(
+                    None, _remove_when_done, source, tasks)
+
+
+async def aparse(fp, executor=None, **kw):
+    """Parse a document with an executor and return a :class:`.Document`,
+    see :class:`.AsyncParser`. """
+    return await AsyncParser(executor, **kw).parse(fp)
+
+
+def aiter_pages(fp, executor=None, **kw):
+    """Asynchronously iterate over pages of a document, parsed with an
+    executor, see :class:`.AsyncParser`. """
+    return AsyncParser(executor, **kw).iter_pages(fp)
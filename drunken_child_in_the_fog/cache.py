@@ -0,0 +1,209 @@
+# -*- encoding: utf-8 -*-
+
+"""On-disk cache of parsed documents.
+
+Documents are stored as compressed, per-page element tuples (see
+:meth:`.DrunkenChildInTheFog.iter_raw_pages`), keyed by the content of the
+PDF file, parsing parameters and the library version. Restoring a document
+from the cache does not import, nor run pdfminer.
+"""
+
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+import zlib
+
+from drunken_child_in_the_fog import __version__
+from drunken_child_in_the_fog.core import Document, TEXT, KINDS, \
+    SENTINELS, _open_input
+
+# Bump it every time the binary format changes.
+FORMAT_VERSION = 1
+
+MAGIC = b"DCF"
+SUFFIX = ".dcf"
+
+_HEADER = struct.Struct("<3sBI")
+_PAGE = struct.Struct("<ddI")
+_ELEMENT = struct.Struct("<ddddBI")
+
+
+class CorruptCacheEntry(Exception):
+    """Raised when a cache file can not be decoded. """
+    pass
+
+
+def _encode_text(text):
+    if sys.version_info < (3, 3):
+        return text
+    return text.encode("utf-8")
+
+
+def _decode_text(data):
+    if sys.version_info < (3, 3):
+        return data
+    return data.decode("utf-8")
+
+
+def dumps(raw_pages):
+    """Serialize a list of raw pages to compressed bytes. """
+    chunks = [_HEADER.pack(MAGIC, FORMAT_VERSION, len(raw_pages))]
+    for width, height, elements in raw_pages:
+        chunks.append(_PAGE.pack(width, height, len(elements)))
+        for x1, y1, x2, y2, text in elements:
+            kind = KINDS.get(text, TEXT)
+            data = _encode_text(text) if kind == TEXT else b""
+            chunks.append(_ELEMENT.pack(x1, y1, x2, y2, kind, len(data)))
+            chunks.append(data)
+    return zlib.compress(b"".join(chunks))
+
+
+def loads(data):
+    """Deserialize raw pages serialized with :func:`.dumps`. """
+    try:
+        data = zlib.decompress(data)
+        magic, version, page_count = _HEADER.unpack_from(data, 0)
+    except (zlib.error, struct.error):
+        raise CorruptCacheEntry
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise CorruptCacheEntry
+
+    offset = _HEADER.size
+    raw_pages = []
+    try:
+        for _ in range(page_count):
+            width, height, count = _PAGE.unpack_from(data, offset)
+            offset += _PAGE.size
+            elements = []
+            for _ in range(count):
+                x1, y1, x2, y2, kind, size = _ELEMENT.unpack_from(
+                    data, offset)
+                offset += _ELEMENT.size
+                if kind == TEXT:
+                    text = _decode_text(data[offset:offset + size])
+                    offset += size
+                else:
+                    text = SENTINELS[kind]
+                elements.append((x1, y1, x2, y2, text))
+            raw_pages.append((width, height, elements))
+    except (struct.error, KeyError, UnicodeDecodeError):
+        raise CorruptCacheEntry
+    return raw_pages
+
+
+class DocumentCache:
+    """Cache of parsed documents in a directory. Least recently used entries
+    are removed when the total size of the cache exceeds max_size bytes.
+
+    >>> cache = DocumentCache("/var/cache/pdf")
+    >>> document = cache.get_document(open("file.pdf", "rb"))
+    """
+
+    def __init__(self, directory, max_size=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def key(self, fp, char_margin=1):
+        """Return cache key for a PDF file, given as anything accepted by
+        :class:`.DrunkenChildInTheFog`. A file object is read from the start
+        and rewound. """
+        digest = hashlib.sha256()
+        fp, owned = _open_input(fp)
+        try:
+            fp.seek(0)
+            while True:
+                chunk = fp.read(1024 * 1024)
+                if not chunk:
+                    break
+                digest.update(chunk)
+            fp.seek(0)
+        finally:
+            if owned:
+                fp.close()
+
+        params = "%s:%s:char_margin=%r" % (
+            __version__, FORMAT_VERSION, char_margin)
+        digest.update(params.encode("utf-8"))
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def load(self, key):
+        """Return raw pages stored under key, or None. """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except (IOError, OSError):
+            return None
+
+        try:
+            raw_pages = loads(data)
+        except CorruptCacheEntry:
+            self._remove(path)
+            return None
+
+        # Mark the entry as recently used.
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return raw_pages
+
+    def store(self, key, raw_pages):
+        """Store raw pages under key, then evict old entries if needed. """
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(dumps(raw_pages))
+            os.rename(tmp, self.path(key))
+        except Exception:
+            self._remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries, until the cache fits in
+        max_size bytes. """
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+            total += stat.st_size
+
+        entries.sort()
+        for mtime, path, size in entries:
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def get_document(self, fp, char_margin=1, workers=None):
+        """Return a :class:`.Document` for the PDF file. It is parsed with
+        :class:`.DrunkenChildInTheFog` only if not found in the cache. """
+        key = self.key(fp, char_margin)
+        raw_pages = self.load(key)
+        if raw_pages is None:
+            from drunken_child_in_the_fog.core import DrunkenChildInTheFog
+            with DrunkenChildInTheFog(fp, char_margin=char_margin) as parser:
+                raw_pages = list(parser.iter_raw_pages(workers=workers))
+            self.store(key, raw_pages)
+        return Document.from_raw_pages(raw_pages)
@@ -0,0 +1,192 @@
+# -*- encoding: utf-8 -*-
+
+"""Command line batch extraction tool.
+
+Extracts every element from many PDF files, in parallel, and writes them as
+JSON Lines, CSV or Parquet, file by file, as soon as every file is done::
+
+    drunken_child_in_the_fog --format csv --workers 8 reports/ > out.csv
+"""
+
+import argparse
+import glob
+import io
+import os
+import sys
+from multiprocessing import Pool, cpu_count
+
+from drunken_child_in_the_fog.core import DrunkenChildInTheFog, Extractor
+from drunken_child_in_the_fog.export import WRITERS, iter_rows
+
+# Extractors of the current process, reused for every file.
+_extractors = {}
+
+
+def parse_page_ranges(value):
+    """Parse page ranges like "1-3,5,10-" into a list of (first, last)
+    1-based page numbers, where last may be None. """
+    ret = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                first, last = part.split("-", 1)
+                first = int(first) if first.strip() else 1
+                last = int(last) if last.strip() else None
+            else:
+                first = last = int(part)
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                "invalid page range: %r" % part)
+        if first < 1 or (last is not None and last < first):
+            raise argparse.ArgumentTypeError(
+                "invalid page range: %r" % part)
+        ret.append((first, last))
+    return ret
+
+
+def in_ranges(number, ranges):
+    """Returns True if 1-based page number is in ranges. """
+    if ranges is None:
+        return True
+    for first, last in ranges:
+        if first <= number and (last is None or number <= last):
+            return True
+    return False
+
+
+def find_files(inputs):
+    """Expand files, directories (searched recursively for .pdf files) and
+    glob patterns into a sorted list of paths. """
+    ret = []
+    for name in inputs:
+        if os.path.isdir(name):
+            for root, dirs, files in os.walk(name):
+                dirs.sort()
+                for filename in sorted(files):
+                    if filename.lower().endswith(".pdf"):
+                        ret.append(os.path.join(root, filename))
+        elif os.path.exists(name):
+            ret.append(name)
+        else:
+            matches = sorted(glob.glob(name))
+            if not matches:
+                # Reported as a failure of this file later on.
+                ret.append(name)
+            ret.extend(matches)
+    return ret
+
+
+def get_extractor(char_margin, layout_analysis):
+    """Return :class:`.Extractor` of the current process. """
+    key = (char_margin, layout_analysis)
+    if key not in _extractors:
+        _extractors[key] = Extractor(char_margin, layout_analysis)
+    return _extractors[key]
+
+
+def extract(args):
+    """Extract rows from a single file.
+
+    :param args: (path, char_margin, layout_analysis, page ranges) tuple
+    :return: (path, rows, error) tuple. Error is None, or a message if the
+        file could not be processed.
+    """
+    path, char_margin, layout_analysis, ranges = args
+    rows = []
+    try:
+        with open(path, "rb") as fp:
+            parser = DrunkenChildInTheFog(
+                fp, extractor=get_extractor(char_margin, layout_analysis))
+            # Pages out of ranges are not parsed at all.
+            for page_rows in iter_rows(
+                    parser, path,
+                    predicate=lambda no, page: in_ranges(no + 1, ranges)):
+                rows.extend(page_rows)
+    except Exception as e:
+        return path, None, "%s: %s" % (e.__class__.__name__, e)
+    return path, rows, None
+
+
+def open_output(path, binary=False):
+    """Open output file for a writer. Text files are opened without newline
+    translation, as required by the csv module. """
+    if binary or sys.version_info[0] < 3:
+        return open(path, "wb")
+    return io.open(path, "w", newline="")
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog="drunken_child_in_the_fog",
+        description="Extract text and lines from PDF files.")
+    parser.add_argument(
+        "inputs", nargs="+", metavar="INPUT",
+        help="PDF file, directory with PDF files or a glob pattern")
+    parser.add_argument(
+        "-f", "--format", choices=sorted(WRITERS), default="jsonl",
+        help="output format (default: jsonl)")
+    parser.add_argument(
+        "-o", "--output", default="-",
+        help="output file (default: standard output)")
+    parser.add_argument(
+        "-j", "--workers", type=int, default=cpu_count(),
+        help="number of worker processes (default: number of CPUs)")
+    parser.add_argument(
+        "--char-margin", type=float, default=1,
+        help="LAParams char_margin (default: 1)")
+    parser.add_argument(
+        "--no-layout-analysis", dest="layout_analysis", action="store_false",
+        help="group characters into lines without pdfminer layout analysis; "
+             "faster, for machine generated files")
+    parser.add_argument(
+        "--pages", type=parse_page_ranges, default=None,
+        help="pages to extract, for example 1-3,5,10-")
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    tasks = [(path, args.char_margin, args.layout_analysis, args.pages)
+             for path in find_files(args.inputs)]
+
+    binary = args.format == "parquet"
+    if args.output == "-":
+        output = sys.stdout
+        if binary:
+            output = getattr(sys.stdout, "buffer", sys.stdout)
+    else:
+        output = open_output(args.output, binary)
+
+    failed = 0
+    pool = None
+    try:
+        writer = WRITERS[args.format](output)
+        if args.workers > 1 and len(tasks) > 1:
+            pool = Pool(min(args.workers, len(tasks)))
+            results = pool.imap_unordered(extract, tasks)
+        else:
+            results = (extract(task) for task in tasks)
+
+        for path, rows, error in results:
+            if error is not None:
+                failed += 1
+                sys.stderr.write("%s: %s\n" % (path, error))
+                continue
+            writer.write(rows)
+            output.flush()
+        writer.close()
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        if args.output != "-":
+            output.close()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+# -*- encoding: utf-8 -*-
+
+"""Columnar, NumPy-backed alternative to :class:`.core.ElementSet`.
+
+Coordinates are stored in float arrays, element kinds in a small integer
+array and texts in a side table, so every filter is evaluated as a vectorized
+mask. :class:`.Element` objects are looked up only when the set is iterated,
+or by :meth:`.ColumnarElementSet.first` / :meth:`.ColumnarElementSet.all`.
+
+Requires NumPy (``pip install drunken_child_in_the_fog[numpy]``).
+
+>>> elements = ColumnarElementSet(document.everything())
+>>> elements.text().inside(BoxQuery(0, 0, 100, 100)).count()
+"""
+
+import numpy
+
+from drunken_child_in_the_fog.core import TEXT, HORIZONTAL, VERTICAL, \
+    NoSuchElement
+from drunken_child_in_the_fog.index import DIRECTIONS, nearest, \
+    prefix_matcher, word_matcher, _fold
+from drunken_child_in_the_fog.search import TextMatcher
+
+
+class _Columns:
+    """Column storage, shared by every set derived from the same elements.
+    """
+
+    def __init__(self, elements):
+        self.elements = elements
+        count = len(elements)
+
+        self.x1 = numpy.empty(count, dtype=numpy.float64)
+        self.y1 = numpy.empty(count, dtype=numpy.float64)
+        self.x2 = numpy.empty(count, dtype=numpy.float64)
+        self.y2 = numpy.empty(count, dtype=numpy.float64)
+        self.kind = numpy.empty(count, dtype=numpy.int8)
+        texts = []
+
+        for no, elem in enumerate(elements):
+            self.x1[no] = elem.x1
+            self.y1[no] = elem.y1
+            self.x2[no] = elem.x2
+            self.y2[no] = elem.y2
+            self.kind[no] = elem.kind
+            texts.append(elem.text)
+
+        self.texts = numpy.array(texts, dtype=numpy.str_)
+
+
+def _between(values, low, high, include_low, include_high):
+    if include_low:
+        mask = values >= low
+    else:
+        mask = values > low
+    if include_high:
+        mask &= values <= high
+    else:
+        mask &= values < high
+    return mask
+
+
+class ColumnarElementSet:
+    """Class used to query for :class:`.Element`, with the same API as
+    :class:`.core.ElementSet`. """
+
+    def __init__(self, elements=None, _columns=None, _rows=None):
+        """
+
+        :param elements: iterable of :class:`.Element`, for example an
+            :class:`.core.ElementSet`
+        """
+        if _columns is None:
+            if elements is None:
+                elements = []
+            _columns = _Columns(list(elements))
+            _rows = numpy.arange(len(_columns.elements))
+        self._columns = _columns
+        self._rows = _rows
+
+    def _filter(self, mask):
+        return ColumnarElementSet(_columns=self._columns,
+                                  _rows=self._rows[mask])
+
+    def _subset(self, rows):
+        """Return a set of rows, in the given order. """
+        return ColumnarElementSet(_columns=self._columns,
+                                  _rows=numpy.array(rows, dtype=numpy.intp))
+
+    def _column(self, name):
+        return getattr(self._columns, name)[self._rows]
+
+    def all(self):
+        """Return a list with every :class:`.Element` in the set. """
+        elements = self._columns.elements
+        return [elements[no] for no in self._rows]
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def count(self):
+        """Return number of :class:`.Element` in the set. """
+        return len(self._rows)
+
+    def __len__(self):
+        return self.count()
+
+    def vertical(self):
+        """Returns :class:`.ColumnarElementSet` containing only vertical lines
+        from current set. """
+        return self._filter(self._column("kind") == VERTICAL)
+
+    def horizontal(self):
+        """Returns :class:`.ColumnarElementSet` containing only horizontal
+        lines from current set."""
+        return self._filter(self._column("kind") == HORIZONTAL)
+
+    def lines(self):
+        """Returns :class:`.ColumnarElementSet` containing lines from the
+        current set. """
+        return self._filter(self._column("kind") != TEXT)
+
+    def text(self):
+        """Returns :class:`.ColumnarElementSet` containing every text element
+        from the current set. """
+        return self._filter(self._column("kind") == TEXT)
+
+    def _get(self, no):
+        try:
+            return self._columns.elements[self._rows[no]]
+        except IndexError:
+            raise NoSuchElement
+
+    def first(self):
+        """Returns first Element in set or raises NoSuchElement exception. """
+        return self._get(0)
+
+    def second(self):
+        """Returns second Element in set or raises NoSuchElement exception. """
+        return self._get(1)
+
+    def inside(self, box_query, f="whole_inside"):
+        """Returns :class:`.ColumnarElementSet` which contains every element
+        from the current set contained in a box described by box_query.
+        See :meth:`.core.ElementSet.inside`. """
+
+        def point_inside(x, y):
+            mask = _between(self._column(x), box_query.x1, box_query.x2,
+                            box_query.include_left, box_query.include_right)
+            mask &= _between(self._column(y), box_query.y1, box_query.y2,
+                             box_query.include_top, box_query.include_bottom)
+            return mask
+
+        if f == "starts_inside":
+            mask = point_inside("x1", "y1")
+        elif f == "ends_inside":
+            mask = point_inside("x2", "y2")
+        elif f == "whole_inside":
+            mask = point_inside("x1", "y1") & point_inside("x2", "y2")
+        else:
+            fun = getattr(box_query, f)
+            mask = numpy.array([fun(elem) for elem in self.all()],
+                               dtype=bool)
+        return self._filter(mask)
+
+    def _text_mask(self, text, ignore_case, matcher=None):
+        """Return a mask of elements containing text. Texts containing it
+        are checked with matcher too, if given. """
+        texts = self._column("texts")
+        if ignore_case:
+            mask = numpy.char.find(numpy.char.lower(texts), _fold(text)) >= 0
+        else:
+            mask = numpy.char.find(texts, text) >= 0
+
+        if matcher is not None:
+            matches = matcher(text, ignore_case)
+            for no in numpy.flatnonzero(mask):
+                mask[no] = matches(texts[no])
+        return mask
+
+    def containing_text(self, text, ignore_case=False):
+        """Returns :class:`.ColumnarElementSet` with all elements which have
+        'text' inside."""
+        return self._filter(self._text_mask(text, ignore_case))
+
+    def containing_word(self, word, ignore_case=False):
+        """Returns :class:`.ColumnarElementSet` with all elements which have
+        a whole word 'word' inside. """
+        return self._filter(self._text_mask(word, ignore_case, word_matcher))
+
+    def containing_prefix(self, prefix, ignore_case=False):
+        """Returns :class:`.ColumnarElementSet` with all elements which have
+        a word starting with 'prefix' inside. """
+        return self._filter(self._text_mask(prefix, ignore_case,
+                                            prefix_matcher))
+
+    def nearest(self, element, k=1, direction=None, tolerance=0):
+        """Returns :class:`.ColumnarElementSet` with up to k elements from
+        the current set (every one, if k is None) nearest to element, on the
+        same page, closest first. See :meth:`.core.ElementSet.nearest`. """
+        if direction is not None and direction not in DIRECTIONS:
+            raise ValueError("unknown direction: %r" % direction)
+
+        elements = self._columns.elements
+        page = element.page
+        rows = [no for no in self._rows if elements[no].page is page]
+        found = nearest([elements[no] for no in rows], element, k, direction,
+                        tolerance)
+        positions = dict((id(elements[no]), no) for no in rows)
+        return self._subset([positions[id(elem)] for elem in found])
+
+    def right_of(self, element, tolerance=0):
+        """Returns :class:`.ColumnarElementSet` with elements from the
+        current set to the right of element, closest first. See
+        :meth:`.nearest`. """
+        return self.nearest(element, None, "right", tolerance)
+
+    def left_of(self, element, tolerance=0):
+        return self.nearest(element, None, "left", tolerance)
+
+    def below(self, element, tolerance=0):
+        return self.nearest(element, None, "below", tolerance)
+
+    def above(self, element, tolerance=0):
+        return self.nearest(element, None, "above", tolerance)
+
+    def search_many(self, patterns, regex=False, ignore_case=False):
+        """Search for many patterns in a single pass over the set. See
+        :meth:`.core.ElementSet.search_many`.
+
+        :return: dict mapping every pattern to
+            :class:`.ColumnarElementSet` of elements containing it
+        """
+        matcher = patterns
+        if not isinstance(matcher, TextMatcher):
+            matcher = TextMatcher(patterns, regex, ignore_case)
+
+        found = [[] for _ in matcher.patterns]
+        find = matcher.find
+        for no, text in zip(self._rows, self._column("texts").tolist()):
+            for pattern in find(text):
+                found[pattern].append(no)
+
+        ret = {}
+        for pattern, rows in zip(matcher.patterns, found):
+            if pattern not in ret:
+                ret[pattern] = self._subset(rows)
+        return ret
@@ -1,33 +1,58 @@
 # -*- encoding: utf-8 -*-
 
+import mmap
+import os
+import shutil
 import sys
+import tempfile
+from multiprocessing import Pool
+from timeit import default_timer as timer
 
-import pdfminer
-from pdfminer.converter import PDFPageAggregator
-from pdfminer.layout import LAParams
-from pdfminer.pdfdocument import PDFDocument
-from pdfminer.pdfinterp import PDFPageInterpreter
-from pdfminer.pdfinterp import PDFResourceManager
-from pdfminer.pdfpage import PDFPage
-from pdfminer.pdfpage import PDFTextExtractionNotAllowed
-from pdfminer.pdfparser import PDFParser
+from drunken_child_in_the_fog.index import ElementIndex, TextIndex, \
+    text_matcher, word_matcher, prefix_matcher, nearest, DIRECTIONS
+from drunken_child_in_the_fog.search import TextMatcher
+from drunken_child_in_the_fog.textlines import group_chars
+
+# pdfminer is imported only by DrunkenChildInTheFog methods, so documents
+# restored from the cache (see cache.DocumentCache) can be used without it.
 
 PAGE = "__page__"
 HORIZONTAL_LINE = "__horizontal_line__"
 VERTICAL_LINE = "__vertical_line__"
 
+# Element kinds, see Element.kind
+TEXT = 0
+HORIZONTAL = 1
+VERTICAL = 2
+
+#: Element kind for text of a line element
+KINDS = {HORIZONTAL_LINE: HORIZONTAL, VERTICAL_LINE: VERTICAL}
+
+#: Text of a line element for its kind
+SENTINELS = {HORIZONTAL: HORIZONTAL_LINE, VERTICAL: VERTICAL_LINE}
+
+#: Name of every element kind, used when exporting elements
+KIND_NAMES = {TEXT: "text", HORIZONTAL: "horizontal_line",
+              VERTICAL: "vertical_line"}
+
 
 class NoSuchElement(Exception):
     """Raised when there's no such :class:`Element`. """
     pass
 
 
-class Element:
+class Element(object):
     """Element of a PDF file, with some text inside. Has a bounding box, 
     (x1, y1), (x2, y2). The coordinates system is normalized from PDF 
     notation so Elements have (0,0) in the upper left corner.
+
+    Element kind is one of :data:`TEXT`, :data:`HORIZONTAL` or
+    :data:`VERTICAL`. For lines, text is :data:`HORIZONTAL_LINE` or
+    :data:`VERTICAL_LINE`, shared by every line element.
     """
 
+    __slots__ = ("page", "x1", "y1", "x2", "y2", "text", "kind")
+
     def __init__(self, page, x1, y1, x2, y2, text):
         """
         
@@ -44,6 +69,7 @@ class Element:
         self.x2 = x2
         self.y2 = self.page.height - y1
         self.text = text
+        self.kind = KINDS.get(text, TEXT)
 
     def __repr__(self):
         return "%s, %s, %s, %s, %s" % (self.x1, self.y1, self.x2, self.y2,
@@ -58,6 +84,26 @@ class Element:
     def height(self):
         return self.y2 - self.y1
 
+    def right_of(self, tolerance=0):
+        """Return :class:`.ElementSet` with elements of the page to the
+        right of this one, closest first. See :meth:`.ElementSet.nearest`.
+        """
+        return self.page.everything().right_of(self, tolerance)
+
+    def left_of(self, tolerance=0):
+        return self.page.everything().left_of(self, tolerance)
+
+    def below(self, tolerance=0):
+        return self.page.everything().below(self, tolerance)
+
+    def above(self, tolerance=0):
+        return self.page.everything().above(self, tolerance)
+
+    def nearest(self, k=1, direction=None, tolerance=0):
+        """Return :class:`.ElementSet` with k elements of the page nearest
+        to this one. See :meth:`.ElementSet.nearest`. """
+        return self.page.everything().nearest(self, k, direction, tolerance)
+
 
 class BoxQuery:
     """Helper object used when querying for objects inside a given box
@@ -126,28 +172,136 @@ class BoxQuery:
         return self.starts_inside(element) and self.ends_inside(element)
 
 
-class ElementSet:
+def _is_vertical(elem):
+    return elem.kind == VERTICAL
+
+
+def _is_horizontal(elem):
+    return elem.kind == HORIZONTAL
+
+
+def _is_line(elem):
+    return elem.kind != TEXT
+
+
+def _is_text(elem):
+    return elem.kind == TEXT
+
+
+def _fuse(filters):
+    """Return a single predicate, true if every one of filters is true. """
+    if len(filters) == 1:
+        return filters[0]
+
+    def fused(elem):
+        for predicate in filters:
+            if not predicate(elem):
+                return False
+        return True
+    return fused
+
+
+class ElementSet(object):
     """Class used to query for :class:`.Element`, somehow modelled on 
     `Django QuerySet`_. 
+
+    Like a QuerySet, ElementSet is lazy: filters are only recorded and are
+    evaluated together, in a single pass over the elements, when the set is
+    iterated, or when :meth:`.all`, :meth:`.count`, :meth:`.first` or
+    :meth:`.second` is called. Results of iteration and :meth:`.all` are
+    cached in the set.
     
     .. _Django QuerySet: https://docs.djangoproject.com/en/1.11/ref/models/quer
     ysets/
     """
 
-    def __init__(self, elements=None):
+    #: :meth:`.BoxQuery` methods, which can be answered by
+    #: :class:`.index.ElementIndex`
+    INDEXED_QUERIES = ("starts_inside", "ends_inside", "whole_inside")
+
+    def __init__(self, elements=None, page=None, text_index=None):
+        """
+
+        :param elements: list of :class:`.Element`
+        :param page: :class:`.Page`, if elements are exactly every element
+            from that page. Its spatial index is then used by
+            :meth:`.inside`, and its text index (if enabled) by text queries.
+        :param text_index: :class:`.index.TextIndex` of elements, used by
+            :meth:`.containing_text`, :meth:`.containing_word` and
+            :meth:`.containing_prefix`
+        """
         if elements is None:
             elements = []
-        self.elements = elements
+        self.page = page
+        self.text_index = text_index
+        self._source = elements
+        self._filters = ()
+        self._candidates = None
+        self._result = None
+
+    def _filter(self, predicate=None, candidates=None):
+        """Return a copy of this set with another filter.
+
+        :param predicate: function of an element
+        :param candidates: function returning a list of elements from an
+            index, in the source order. It replaces a predicate scan over the
+            source, so only one may be used in a chain.
+        """
+        ret = ElementSet(self._source, page=self.page,
+                         text_index=self.text_index)
+        ret._filters = self._filters
+        if predicate is not None:
+            ret._filters += (predicate,)
+        ret._candidates = self._candidates
+        if candidates is not None:
+            ret._candidates = candidates
+        return ret
+
+    def _iter(self):
+        """Iterate over elements matching every filter. """
+        if self._result is not None:
+            return iter(self._result)
+
+        source = self._source
+        if self._candidates is not None:
+            source = self._candidates()
+
+        if not self._filters:
+            return iter(source)
+        predicate = _fuse(self._filters)
+        return (elem for elem in source if predicate(elem))
+
+    @property
+    def elements(self):
+        """List of :class:`.Element` in the set. """
+        if self._result is None:
+            if self._candidates is None and not self._filters:
+                self._result = self._source
+            else:
+                self._result = list(self._iter())
+        return self._result
+
+    @elements.setter
+    def elements(self, elements):
+        self._source = elements
+        self._filters = ()
+        self._candidates = None
+        self._result = None
+        self.page = None
+        self.text_index = None
 
     def all(self):
-        """Return a list with every :class:`.Element` in the set. """
-        return self.elements
+        """Return a new list with every :class:`.Element` in the set. """
+        return list(self.elements)
 
     def __iter__(self):
         return self.elements.__iter__()
 
     def count(self):
         """Return number of :class:`.Element` in the set. """
+        if self._result is None and (self._candidates is not None or
+                                     self._filters):
+            return sum(1 for _ in self._iter())
         return len(self.elements)
 
     def __len__(self):
@@ -156,98 +310,264 @@ class ElementSet:
     def vertical(self):
         """Returns :class:`.ElementSet` containing only vertical lines from current 
         set. """
-        return ElementSet([elem for elem in self.elements if elem.text ==
-                           VERTICAL_LINE])
+        return self._filter(_is_vertical)
 
     def horizontal(self):
         """Returns :class:`.ElementSet` containing only horizontal lines from 
         current set."""
-        return ElementSet([elem for elem in self.elements if elem.text ==
-                           HORIZONTAL_LINE])
+        return self._filter(_is_horizontal)
 
     def lines(self):
         """Returns :class:`.ElementSet` containing lines from the current set.
          """
-        return ElementSet([elem for elem in self.elements if elem.text in (
-            HORIZONTAL_LINE, VERTICAL_LINE)])
+        return self._filter(_is_line)
+
+    def _get(self, no):
+        for elem in self._iter():
+            if no == 0:
+                return elem
+            no -= 1
+        raise NoSuchElement
 
     def first(self):
         """Returns first Element in set or raises NoSuchElement exception. """
-        try:
-            return self.elements[0]
-        except IndexError:
-            raise NoSuchElement
+        return self._get(0)
 
     def second(self):
         """Returns second Element in set or raises NoSuchElement exception. """
-        try:
-            return self.elements[1]
-        except IndexError:
-            raise NoSuchElement
+        return self._get(1)
 
     def inside(self, box_query, f="whole_inside"):
         """Returns :class:`.ElementSet` which contains every element from the current 
         set contained in a box described by coordinates (x1, y1), (x2, 
         y2). """
-        ret = []
-        fun = getattr(box_query, f)
-        for element in self.elements:
-            if fun(element):
-                ret.append(element)
-        return ElementSet(ret)
+        if self.page is not None and self._candidates is None and \
+                f in self.INDEXED_QUERIES:
+            # Candidates are taken from the page index, in the page order,
+            # then the remaining filters are applied.
+            page = self.page
+            return self._filter(
+                candidates=lambda: page.index().inside(box_query, f))
+
+        return self._filter(getattr(box_query, f))
 
     def text(self):
         """Returns :class:`.ElementSet` containing every text element from the current 
         set. """
-
-        ret = []
-        for element in self.elements:
-            if element.text not in (HORIZONTAL_LINE, VERTICAL_LINE):
-                ret.append(element)
-        return ElementSet(ret)
-
-    def containing_text(self, text):
+        return self._filter(_is_text)
+
+    def _text_filter(self, matcher, method, text, ignore_case):
+        page = self.page
+        if page is not None and page._text_index_casefold is not None and \
+                self._candidates is None:
+            # Like for inside, the index is taken from the page when the set
+            # is evaluated, so it is never older than the page elements.
+            return self._filter(candidates=lambda: getattr(
+                page.text_index(), method)(text, ignore_case))
+
+        index = self.text_index
+        if index is not None and self._candidates is None:
+            return self._filter(candidates=lambda: getattr(index, method)(
+                text, ignore_case))
+
+        matches = matcher(text, ignore_case)
+        return self._filter(lambda elem: matches(elem.text))
+
+    def containing_text(self, text, ignore_case=False):
         """Returns :class:`.ElementSet` with all elements which have 'text' 
         inside."""
-        return ElementSet([elem for elem in self.elements if elem.text.find(
-            text) >= 0])
+        return self._text_filter(text_matcher, "containing", text,
+                                 ignore_case)
+
+    def containing_word(self, word, ignore_case=False):
+        """Returns :class:`.ElementSet` with all elements which have a whole
+        word 'word' inside. """
+        return self._text_filter(word_matcher, "containing_word", word,
+                                 ignore_case)
+
+    def containing_prefix(self, prefix, ignore_case=False):
+        """Returns :class:`.ElementSet` with all elements which have a word
+        starting with 'prefix' inside. """
+        return self._text_filter(prefix_matcher, "containing_prefix", prefix,
+                                 ignore_case)
+
+    def nearest(self, element, k=1, direction=None, tolerance=0):
+        """Returns :class:`.ElementSet` with up to k elements from the
+        current set (every one, if k is None) nearest to element, on the same
+        page, closest first.
+
+        For sets of every element of a page, the page spatial index is used,
+        so only the neighbourhood of element is searched.
+
+        :param direction: None, or one of 'right', 'left', 'below', 'above'.
+            Elements in a direction must be aligned with element, see
+            :func:`.index.gap`.
+        :param tolerance: allowed misalignment and overlap, in points
+        """
+        if direction is not None and direction not in DIRECTIONS:
+            raise ValueError("unknown direction: %r" % direction)
+
+        if self.page is element.page and self._candidates is None:
+            accept = _fuse(self._filters) if self._filters else None
+            found = self.page.index().nearest(element, k, direction,
+                                              tolerance, accept)
+        else:
+            page = element.page
+            found = nearest([elem for elem in self._iter()
+                             if elem.page is page],
+                            element, k, direction, tolerance)
+        return ElementSet(found)
+
+    def right_of(self, element, tolerance=0):
+        """Returns :class:`.ElementSet` with elements from the current set
+        to the right of element, closest first. See :meth:`.nearest`. """
+        return self.nearest(element, None, "right", tolerance)
+
+    def left_of(self, element, tolerance=0):
+        return self.nearest(element, None, "left", tolerance)
+
+    def below(self, element, tolerance=0):
+        return self.nearest(element, None, "below", tolerance)
+
+    def above(self, element, tolerance=0):
+        return self.nearest(element, None, "above", tolerance)
+
+    def search_many(self, patterns, regex=False, ignore_case=False):
+        """Search for many patterns in a single pass over the set.
+
+        :param patterns: iterable of strings, or a
+            :class:`.search.TextMatcher`, which can be reused for many
+            documents; regex and ignore_case are then ignored
+        :param regex: see :class:`.search.TextMatcher`
+        :param ignore_case: see :class:`.search.TextMatcher`
+        :return: dict mapping every pattern to :class:`.ElementSet` of
+            elements containing it (or matching it, if regex is True), in the
+            order of this set
+        """
+        matcher = patterns
+        if not isinstance(matcher, TextMatcher):
+            matcher = TextMatcher(patterns, regex, ignore_case)
+        found = matcher.search(self._iter())
+        return dict((pattern, ElementSet(elements))
+                    for pattern, elements in found.items())
 
 
-class Page:
+class Page(object):
     """Page keeps track of all the elements.
     """
 
-    def __init__(self, width, height, previous):
+    __slots__ = ("width", "height", "previous", "offset", "number",
+                 "elements", "sorted", "version", "_index", "_text_index",
+                 "_text_index_casefold", "_clusters")
+
+    def __init__(self, width, height, previous, offset=None, number=None):
+        """
+
+        :param width: page width
+        :param height: page height
+        :param previous: previous :class:`.Page` or None
+        :param offset: position of this page in the document, see
+            :meth:`.position_in_document`. By default it is calculated from
+            the previous page. Pass it for pages which are not linked to the
+            previous one (see :meth:`.DrunkenChildInTheFog.iter_pages`).
+        :param number: 1-based number of this page in the PDF file. By
+            default it is the number of the previous page plus one.
+        """
         self.width = width
         self.height = height
         self.previous = previous
+        if offset is None:
+            offset = 0
+            if previous is not None:
+                offset = previous.offset + previous.size()
+        self.offset = offset
+        if number is None:
+            number = 1
+            if previous is not None:
+                number = previous.number + 1
+        self.number = number
         self.elements = []
+        #: False if elements were added since the page was last sorted
+        self.sorted = True
+        #: Incremented every time elements of the page change
+        self.version = 0
+        self._index = None
+        self._text_index = None
+        self._text_index_casefold = None
+        self._clusters = {}
+
+    def _changed(self):
+        self.version += 1
+        self._index = None
+        self._text_index = None
+        self._clusters = {}
 
     def add_element(self, x1, y1, x2, y2, text):
         self.elements.append(Element(self, x1, y1, x2, y2, text))
         self.sorted = False
+        self._changed()
 
-    def position_in_document(self):
-        """This returns a single integer, giving this page position in the
-        whole document. It is calculated including every previous page 
-        width and height. """
-        if self.previous is None:
-            return 0
+    def index(self):
+        """Return :class:`.index.ElementIndex` of this page, built on first
+        use and rebuilt after the elements change. """
+        if self._index is None or self._index.elements is not self.elements:
+            self._index = ElementIndex(self.elements, self.width, self.height)
+        return self._index
+
+    def build_text_index(self, casefold=True):
+        """Enable :class:`.index.TextIndex` for this page. It is then used by
+        text queries on :meth:`.everything`, and rebuilt after the elements
+        change.
 
+        :param casefold: see :class:`.index.TextIndex`
+        """
+        self._text_index_casefold = casefold
+        self._text_index = None
+
+    def text_index(self):
+        """Return :class:`.index.TextIndex` of this page or None, if it was
+        not enabled by :meth:`.build_text_index`. """
+        if self._text_index_casefold is None:
+            return None
+        if self._text_index is None or \
+                self._text_index.elements is not self.elements:
+            self._text_index = TextIndex(self.elements,
+                                         self._text_index_casefold)
+        return self._text_index
+
+    def size(self):
+        """Return the number of positions this page takes in the document,
+        see :meth:`.position_in_document`. """
         # For proper element rendering in 2 decimal places, we need to
         # multiply the width by 100.
-        current_position = self.previous.width * 100 * self.previous.height
-        return self.previous.position_in_document() + current_position
+        return self.width * 100 * self.height
+
+    def position_in_document(self):
+        """This returns a single integer, giving this page position in the
+        whole document. It is calculated including every previous page 
+        width and height, when the page is created. """
+        return self.offset
 
     def sort_elements(self):
         """Sort elements in-place, basing on their position on the page.  """
-        self.elements.sort(key=lambda elem: elem.position_in_document())
+        # Same order as Element.position_in_document, without the page offset
+        # which is equal for every element.
+        width = self.width * 100
+        self.elements.sort(key=lambda elem: width * elem.y1 + elem.x1)
         self.sorted = True
+        self._changed()
+
+    def sort(self):
+        """Sort and defragment elements, unless the page is already sorted.
+        """
+        if not self.sorted:
+            self.sort_elements()
+            self.defrag_lines()
 
     def everything(self):
         """Return an :class:`.ElementSet` with every single element from this 
         page. """
-        return ElementSet(self.elements)
+        return ElementSet(self.elements, page=self)
 
     def inside(self, *args, **kw):
         """Return an :class:`.ElementSet` with every single element from this page, 
@@ -261,41 +581,177 @@ class Page:
         """
         return self.inside(BoxQuery(left, top, self.width, self.height))
 
-    def containing_text(self, text):
+    def containing_text(self, text, ignore_case=False):
         """Return an :class:`.ElementSet` with every single element containing text 
         specified by parameter. See Element.contains_text for details. """
-        return self.everything().containing_text(text)
+        return self.everything().containing_text(text, ignore_case)
 
     def lines(self):
         return self.everything().lines()
 
+    def rows(self, tolerance=2, align="center"):
+        """Return a list of rows of text elements, from the top of the page.
+        Every row is an :class:`.ElementSet`, ordered from left to right.
+
+        Elements are sorted by their vertical position and a new row starts
+        where it differs from the previous element by more than tolerance.
+        Results are cached until elements of the page change.
+
+        :param align: position compared: 'top', 'center' or 'bottom'
+        """
+        return self._cluster("rows", tolerance, align)
+
+    def columns(self, tolerance=2, align="left"):
+        """Return a list of columns of text elements, from the left of the
+        page. Every column is an :class:`.ElementSet`, ordered from the top.
+        See :meth:`.rows`.
+
+        :param align: position compared: 'left', 'center' or 'right'
+        """
+        return self._cluster("columns", tolerance, align)
+
+    def _cluster(self, axis, tolerance, align):
+        key = (axis, tolerance, align)
+        groups = self._clusters.get(key)
+        if groups is None:
+            if align not in _POSITIONS[axis]:
+                raise ValueError("unknown align: %r" % align)
+            position = _POSITIONS[axis][align]
+            order = _ORDERS[axis]
+            self.sort()
+            elements = [elem for elem in self.elements if elem.kind == TEXT]
+            # Tuples, so the cached groups can not be changed by callers.
+            groups = [tuple(sorted(group, key=order))
+                      for group in _clusters(elements, position, tolerance)]
+            self._clusters[key] = groups
+        return [ElementSet(group) for group in groups]
+
+    def tables(self, tolerance=1):
+        """Return a list of :class:`.tables.Table` reconstructed from lines on
+        this page, with text elements assigned to cells. See
+        :func:`.tables.find_tables`. """
+        from drunken_child_in_the_fog.tables import find_tables
+        return find_tables(self, tolerance)
+
     def vertical(self):
         return self.everything().lines().vertical()
 
     def horizontal(self):
         return self.everything().lines().horizontal()
 
-    def defrag_lines(self):
-        remove = []
-        lines = self.lines().all()
-
-        for line in lines:
-            if line in remove:
-                continue
-
-            for other_line in lines:
-                if other_line in remove:
-                    continue
-                if line == other_line:
-                    continue
-                if line.text == other_line.text:  # same type
-                    if other_line.x1 == line.x2 and other_line.y1 == line.y2:
-                        line.x2 = other_line.x2
-                        line.y2 = other_line.y2
-                        remove.append(other_line)
+    def defrag_lines(self, tolerance=0, overlapping=False):
+        """Merge line segments of the same kind, lying on the same horizontal
+        (or vertical) line, where one segment starts at the end of another.
+        Chains of segments are merged into a single line.
 
-        for line in remove:
-            self.elements.remove(line)
+        :param tolerance: merge segments separated by a gap, or overlapping
+            each other by at most this distance
+        :param overlapping: merge overlapping segments too, no matter how much
+            they overlap
+        :return: number of removed segments
+        """
+        elements = self.elements
+        lines = [(no, elem.kind, elem.x1, elem.y1, elem.x2, elem.y2)
+                 for no, elem in enumerate(elements) if elem.kind != TEXT]
+        ends, remove = _merge_lines(lines, tolerance, overlapping)
+        for no, end in ends.items():
+            if elements[no].kind == HORIZONTAL:
+                elements[no].x2 = end
+            else:
+                elements[no].y2 = end
+
+        if remove:
+            elements[:] = [elem for no, elem in enumerate(elements)
+                           if no not in remove]
+            self._changed()
+        return len(remove)
+
+
+#: Positions compared by :meth:`.Page.rows` and :meth:`.Page.columns`
+_POSITIONS = {
+    "rows": {
+        "top": lambda elem: elem.y1,
+        "center": lambda elem: (elem.y1 + elem.y2) / 2.0,
+        "bottom": lambda elem: elem.y2,
+    },
+    "columns": {
+        "left": lambda elem: elem.x1,
+        "center": lambda elem: (elem.x1 + elem.x2) / 2.0,
+        "right": lambda elem: elem.x2,
+    },
+}
+
+# Order of elements inside of a row or a column
+_ORDERS = {
+    "rows": lambda elem: (elem.x1, elem.y1),
+    "columns": lambda elem: (elem.y1, elem.x1),
+}
+
+
+def _clusters(elements, position, tolerance):
+    """Split elements into groups, where positions of neighbouring elements
+    differ by at most tolerance. Returns a list of lists, ordered by position.
+    """
+    groups = []
+    last = None
+    for value, elem in sorted(((position(elem), elem) for elem in elements),
+                              key=lambda item: item[0]):
+        if last is None or value - last > tolerance:
+            groups.append([])
+        groups[-1].append(elem)
+        last = value
+    return groups
+
+
+def _merge_lines(lines, tolerance=0, overlapping=False):
+    """Find line segments to merge, see :meth:`.Page.defrag_lines`.
+
+    :param lines: iterable of (key, kind, x1, y1, x2, y2) tuples of
+        horizontal and vertical lines, where key identifies the line
+    :return: (ends, removed) tuple, where ends is a dict mapping keys of
+        extended lines to their new x2 (of a horizontal line) or y2 (of a
+        vertical one) and removed is a set of keys of lines merged into
+        another
+    """
+    groups = {}
+    for key, kind, x1, y1, x2, y2 in lines:
+        if kind == HORIZONTAL:
+            groups.setdefault((kind, y1), []).append((x1, x2, key))
+        else:
+            groups.setdefault((kind, x1), []).append((y1, y2, key))
+
+    ends = {}
+    removed = set()
+    for segments in groups.values():
+        if len(segments) < 2:
+            continue
+        segments.sort(key=lambda segment: segment[:2])
+
+        # Chains which may still be extended, as [key, end] lists. A segment
+        # inside of another one starts a chain of its own, without ending
+        # the longer one.
+        chains = []
+        for start, end, key in segments:
+            for chain in chains:
+                if _touches(chain[1], start, tolerance, overlapping):
+                    if end > chain[1]:
+                        chain[1] = ends[chain[0]] = end
+                    removed.add(key)
+                    break
+            else:
+                # Chains ending before start can not be extended any more.
+                chains = [chain for chain in chains
+                          if chain[1] + tolerance >= start]
+                chains.append([key, end])
+    return ends, removed
+
+
+def _touches(end, start, tolerance, overlapping):
+    """Returns True if a segment starting at start should be merged with a
+    segment ending at end. See :meth:`.Page.defrag_lines`. """
+    if overlapping:
+        return start <= end + tolerance
+    return abs(start - end) <= tolerance
 
 
 class Document:
@@ -303,80 +759,421 @@ class Document:
 
     def __init__(self):
         self.pages = [None]
+        #: Position of every page in the document, see
+        #: :meth:`.Page.position_in_document`
+        self.offsets = []
+        self.next_offset = 0
+        self.next_number = 1
+        self._everything = None
+        self._versions = None
+        self._text_index = None
+        self._text_index_casefold = None
 
     def add_page(self, width, height):
         """Add the next page. """
-        page = Page(width, height, self.pages[-1])
+        page = Page(width, height, self.pages[-1], offset=self.next_offset,
+                    number=self.next_number)
         self.pages.append(page)
+        self.offsets.append(page.offset)
+        self.next_offset += page.size()
+        self.next_number += 1
         return page
 
+    def skip_page(self, width, height):
+        """Skip the next page, which was not parsed. Pages added later keep
+        their numbers and positions, as if it was there. """
+        self.next_offset += width * 100 * height
+        self.next_number += 1
+
+    @classmethod
+    def from_raw_pages(cls, raw_pages):
+        """Build a sorted :class:`.Document` from an iterable of
+        (width, height, elements) tuples, where elements is a list of
+        (x1, y1, x2, y2, text) tuples in PDF notation, as returned by
+        :meth:`.DrunkenChildInTheFog.iter_raw_pages`. """
+        ret = cls()
+        for width, height, elements in raw_pages:
+            page = ret.add_page(width, height)
+            for elem in elements:
+                page.add_element(*elem)
+        ret.sort()
+        return ret
+
     def everything(self):
         """Returns a sorted :class:`.ElementSet` containing every single element, 
         from every single page. Elements are sorted by their position in the 
-        document. """
+        document.
+
+        The list of elements is cached and built again only if some page
+        changed since the previous call. """
+        return ElementSet(self._elements(), text_index=self.text_index())
+
+    def _elements(self):
+        """Return cached tuple of every element, sorted. """
         self.sort()
-        ret = []
-        for page in self.get_pages():
-            for elem in page.elements:
-                ret.append(elem)
-        return ElementSet(ret)
+
+        pages = self.get_pages()
+        versions = tuple(page.version for page in pages)
+        if self._everything is None or versions != self._versions:
+            ret = []
+            for page in pages:
+                ret.extend(page.elements)
+            self._everything = tuple(ret)
+            self._versions = versions
+            self._text_index = None
+        return self._everything
+
+    def build_text_index(self, casefold=True):
+        """Enable :class:`.index.TextIndex` for the whole document. It is
+        built once, used by text queries on :meth:`.everything` and built
+        again only if some page changed.
+
+        :param casefold: see :class:`.index.TextIndex`
+        """
+        self._text_index_casefold = casefold
+        self._text_index = None
+
+    def text_index(self):
+        """Return :class:`.index.TextIndex` of the document or None, if it was
+        not enabled by :meth:`.build_text_index`. """
+        if self._text_index_casefold is None:
+            return None
+        elements = self._elements()
+        if self._text_index is None:
+            self._text_index = TextIndex(elements, self._text_index_casefold)
+        return self._text_index
 
     def get_pages(self):
         """Return all pages. """
         return self.pages[1:]
 
+    def search_many(self, patterns, regex=False, ignore_case=False):
+        """Search for many patterns in every element of the document, see
+        :meth:`.ElementSet.search_many`. """
+        return self.everything().search_many(patterns, regex, ignore_case)
+
+    def get_page(self, number):
+        """Return page with 1-based number, see :attr:`.Page.number`.
+
+        :raises NoSuchElement: if there is no such page, or it was skipped
+        """
+        for page in self.get_pages():
+            if page.number == number:
+                return page
+        raise NoSuchElement
+
     def sort(self):
-        """Sort elements in every single page. """
+        """Sort elements in every single page, which changed since it was
+        last sorted. """
         for page in self.get_pages():
-            page.sort_elements()
-            page.defrag_lines()
+            page.sort()
 
 
 class UnknownLineException(Exception):
     pass
 
 
+if sys.version_info >= (3, 0):
+    _STRINGS = (str,)
+else:
+    _STRINGS = (basestring,)  # noqa: F821
+
+
+class _BufferReader(object):
+    """Read-only, seekable file over bytes, a memoryview or an mmap, as
+    expected by pdfminer PDFParser (read, seek and tell). Only chunks being
+    read are copied, never the whole buffer.
+
+    :param name: path of the file, if the buffer was mapped from a file
+    :param owner: closed along with the reader, like an mmap
+    """
+
+    def __init__(self, buffer, name=None, owner=None):
+        self.buffer = buffer
+        self.name = name
+        self.owner = owner
+        self.position = 0
+
+    def read(self, size=-1):
+        start = self.position
+        end = len(self.buffer)
+        if size is not None and size >= 0:
+            end = min(start + size, end)
+        if end <= start:
+            return b""
+        self.position = end
+
+        data = self.buffer[start:end]
+        if isinstance(data, memoryview):
+            return data.tobytes()
+        if not isinstance(data, bytes):
+            return bytes(data)
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += len(self.buffer)
+        self.position = max(offset, 0)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        self.buffer = b""
+        if self.owner is not None:
+            self.owner.close()
+            self.owner = None
+
+
+def _is_buffer(source):
+    if isinstance(source, (bytearray, memoryview)):
+        return True
+    # On Python 2 bytes are paths, pass a bytearray or memoryview instead.
+    return isinstance(source, bytes) and sys.version_info >= (3, 0)
+
+
+def _path(source):
+    """Return source as a path, or None if it is not a path. """
+    if hasattr(source, "__fspath__"):
+        return source.__fspath__()
+    if isinstance(source, _STRINGS):
+        return source
+    return None
+
+
+def _open_input(source):
+    """Return a (fp, owned) tuple for a PDF file given as a file object,
+    bytes, memoryview or a path. Files are memory mapped. If owned is True,
+    fp was opened here and should be closed by the caller. """
+    if hasattr(source, "read"):
+        return source, False
+
+    if _is_buffer(source):
+        return _BufferReader(source), True
+
+    path = _path(source)
+    if path is None:
+        raise TypeError("expected a file object, bytes, memoryview or a "
+                        "path, got %r" % type(source))
+
+    with open(path, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can not be mapped.
+            return _BufferReader(b"", name=path), True
+    return _BufferReader(mapped, name=path, owner=mapped), True
+
+
+def _worker_source(source):
+    """Return a (path, temporary) tuple, where path is a file other processes
+    can open. Files only in memory are written to a temporary file once,
+    rather than sent to every task; temporary is then True and the caller
+    removes the file when workers are done. """
+    if not _is_buffer(source):
+        path = _path(source)
+        if path is not None:
+            return path, False
+
+        name = getattr(source, "name", None)
+        if isinstance(name, _STRINGS) and os.path.isfile(name):
+            return name, False
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        if _is_buffer(source):
+            tmp.write(source)
+        else:
+            position = source.tell()
+            try:
+                source.seek(0)
+                shutil.copyfileobj(source, tmp)
+            finally:
+                source.seek(position)
+    return tmp.name, True
+
+
+def _parse_pages(args):
+    """Parse selected pages of a PDF file in a worker process.
+
+    :param args: (source, char_margin, layout_analysis, indices,
+        collect_stats) tuple. Source is a path to the file, see
+        :func:`._worker_source`, indices is a list of 0-based page numbers.
+    :return: (raw_pages, stats) tuple, where raw_pages is a list of
+        (number, raw page) tuples, see
+        :meth:`.DrunkenChildInTheFog.iter_raw_pages`, and stats is a list of
+        :class:`.PageStats`, or None if collect_stats is False.
+    """
+    source, char_margin, layout_analysis, indices, collect_stats = args
+    stats = None
+    if collect_stats:
+        from drunken_child_in_the_fog.stats import ParseStats
+        stats = ParseStats()
+    with DrunkenChildInTheFog(source, char_margin=char_margin, stats=stats,
+                              layout_analysis=layout_analysis) as parser:
+        raw_pages = [item for item in parser._iter_numbered_raw_pages(indices)
+                     if item[1][2] is not None]
+    return raw_pages, stats.pages if collect_stats else None
+
+
+def _sort_page(no, page, stats=None):
+    """Sort and defragment a page with 0-based number no, collecting stats
+    if given. """
+    if stats is None:
+        page.sort_elements()
+        page.defrag_lines()
+        return
+
+    start = timer()
+    page.sort_elements()
+    sorted_at = timer()
+    merged = page.defrag_lines()
+    stats.add_time(no + 1, "sort", sorted_at - start)
+    stats.add_time(no + 1, "defrag", timer() - sorted_at)
+
+    page_stats = stats.page(no + 1)
+    page_stats.merged_lines = merged
+    page_stats.lines = sum(1 for elem in page.elements if elem.kind)
+    stats.page_done(no + 1)
+
+
+def _clean_text(text, strip=True):
+    """Replace new lines in text from pdfminer with spaces. """
+    if sys.version_info < (3, 3):
+        text = text.encode("utf-8")
+    text = text.replace("\n", " ")
+    if strip:
+        return text.strip()
+    return text
+
+
+def _page_size(page):
+    """Return (width, height) of a pdfminer PDFPage, the same as of its
+    layout, without parsing it. """
+    x1, y1, x2, y2 = page.mediabox
+    width, height = abs(x2 - x1), abs(y2 - y1)
+    if page.rotate % 180 == 90:
+        return height, width
+    return width, height
+
+
+class _LayoutTimer(object):
+    """Wraps end_page of a pdfminer device, where layout analysis is done,
+    and stores its time. """
+
+    def __init__(self, end_page):
+        self.end_page = end_page
+        self.elapsed = 0.0
+
+    def __call__(self, page):
+        start = timer()
+        try:
+            return self.end_page(page)
+        finally:
+            self.elapsed = timer() - start
+
+    @classmethod
+    def install(cls, device):
+        """Return the timer of a device, wrapping it only once. """
+        if not isinstance(device.end_page, cls):
+            device.end_page = cls(device.end_page)
+        return device.end_page
+
+
 class DrunkenChildInTheFog:
     """This is who we are, when we enter the real of PDF analysis madness. 
     A drunken children in the fog, looking for their way out.
     
     >>> document = DrunkenChildInTheFog(open("file.pdf")).get_document()
     >>> document.everything()
+
+    :param fp: the PDF file, as:
+
+        * a readable, seekable binary file object (read, seek and tell are
+          used), which is not closed by :meth:`.close`,
+        * bytes, bytearray or memoryview, read without copying it
+          (on Python 2 use a bytearray or a memoryview, as bytes are paths),
+        * a path, the file is memory mapped until :meth:`.close`.
+
+    :param stats: :class:`.ParseStats`, collecting time spent in every stage
+        of parsing every page
+    :param layout_analysis: if False, pdfminer layout analysis is not run.
+        Characters are grouped into lines by :func:`.textlines.group_chars`
+        instead, which is much faster, but works well only for neatly placed,
+        machine generated text.
+    :param extractor: :class:`.Extractor` to reuse, instead of creating a new
+        one. char_margin and layout_analysis are taken from it.
     """
 
-    def __init__(self, fp, char_margin=1):
-        self.fp = fp
+    def __init__(self, fp, char_margin=1, stats=None, layout_analysis=True,
+                 extractor=None):
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfpage import PDFTextExtractionNotAllowed
+        from pdfminer.pdfparser import PDFParser
+
+        if extractor is None:
+            extractor = Extractor(char_margin, layout_analysis)
+        else:
+            extractor.reset()
 
-        self.parser = PDFParser(self.fp)
+        self.fp, self._owns_fp = _open_input(fp)
+        self.extractor = extractor
+        self.char_margin = extractor.char_margin
+        self.stats = stats
+        self.layout_analysis = extractor.layout_analysis
 
-        # Create a PDF document object that stores the document structure.
-        # Password for initialization as 2nd parameter
-        self.document = PDFDocument(self.parser)
+        try:
+            self.parser = PDFParser(self.fp)
 
-        # Check if the document allows text extraction. If not, abort.
+            # Create a PDF document object that stores the document
+            # structure. Password for initialization as 2nd parameter
+            self.document = PDFDocument(self.parser)
 
-        if not self.document.is_extractable:
-            raise PDFTextExtractionNotAllowed
+            # Check if the document allows text extraction. If not, abort.
 
-        # Create a PDF resource manager object that stores shared resources.
-        self.rsrcmgr = PDFResourceManager()
+            if not self.document.is_extractable:
+                raise PDFTextExtractionNotAllowed
+        except Exception:
+            self.close()
+            raise
 
-        # BEGIN LAYOUT ANALYSIS
-        # Set parameters for analysis.
-        self.laparams = LAParams(char_margin=char_margin)
+        self.rsrcmgr = extractor.rsrcmgr
+        self.laparams = extractor.laparams
+        self.device = extractor.device
+        self.interpreter = extractor.interpreter
 
-        # Create a PDF page aggregator object.
-        self.device = PDFPageAggregator(self.rsrcmgr, laparams=self.laparams)
+        if stats is not None:
+            self._layout_timer = _LayoutTimer.install(self.device)
 
-        # Create a PDF interpreter object.
-        self.interpreter = PDFPageInterpreter(self.rsrcmgr, self.device)
+    def close(self):
+        """Close the file, if it was opened by this object (given as a path,
+        bytes or memoryview). File objects are left open. """
+        if self._owns_fp:
+            self.fp.close()
+            self._owns_fp = False
 
-    def _parse_obj(self, lt_objs):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _parse_obj(self, lt_objs, chars=None):
+        """Yield elements of layout objects.
+
+        :param chars: if given, single characters (left as they are without
+            layout analysis) are appended to it. Like with layout analysis,
+            characters inside figures are skipped.
+        """
+        from pdfminer.layout import LTChar, LTFigure, LTLine, \
+            LTTextBoxHorizontal
 
         # loop over the object list
         for obj in lt_objs:
 
-            if isinstance(obj, pdfminer.layout.LTLine):
+            if isinstance(obj, LTLine):
                 p1 = obj.pts[0]
                 p2 = obj.pts[1]
 
@@ -395,41 +1192,287 @@ class DrunkenChildInTheFog:
                 yield (p1[0], p1[1], p2[0], p2[1], ltype)
 
             # if it's a textbox, debug(text and location
-            elif isinstance(obj, pdfminer.layout.LTTextBoxHorizontal):
+            elif isinstance(obj, LTTextBoxHorizontal):
                 for elem in obj._objs:
                     assert elem.bbox[0] <= elem.bbox[2]
                     assert elem.bbox[1] <= elem.bbox[3]
 
-                    txt = elem.get_text()
-                    if sys.version_info < (3, 3):
-                        txt = txt.encode("utf-8").replace("\n", " ").strip()
-                    else:
-                        txt = txt.replace("\n", " ").strip()
-
                     yield (elem.bbox[0], elem.bbox[1],
                            elem.bbox[2], elem.bbox[3],
-                           txt)
+                           _clean_text(elem.get_text()))
+
+            elif chars is not None and isinstance(obj, LTChar):
+                chars.append((obj.x0, obj.y0, obj.x1, obj.y1,
+                              _clean_text(obj.get_text(), strip=False)))
 
             # if it's a container, recurse
-            elif isinstance(obj, pdfminer.layout.LTFigure):
+            elif isinstance(obj, LTFigure):
                 for elem in self._parse_obj(obj._objs):
                     yield elem
 
-    def get_document(self):
-        # loop over all pages in the document
+    def _iter_selected(self, pages=None, predicate=None):
+        """Yield a (number, page, selected) tuple for every page of the
+        document, where page is a pdfminer PDFPage. Nothing is parsed. Pages
+        after the last one in pages are not yielded at all. """
+        from pdfminer.pdfpage import PDFPage
+
+        last = None
+        if pages is not None:
+            pages = set(pages)
+            if any(no < 0 for no in pages):
+                count = self.count_pages()
+                pages = set(no + count if no < 0 else no for no in pages)
+            last = max(pages) if pages else -1
+
+        for no, page in enumerate(PDFPage.create_pages(self.document)):
+            if last is not None and no > last:
+                break
+            selected = pages is None or no in pages
+            if selected and predicate is not None:
+                selected = predicate(no, page)
+            yield no, page, selected
+
+    def _process_page(self, no, page):
+        """Return a pdfminer layout object of a page. """
+        if self.stats is None:
+            self.interpreter.process_page(page)
+        else:
+            start = timer()
+            self.interpreter.process_page(page)
+            elapsed = timer() - start
+            layout_time = self._layout_timer.elapsed
+            self.stats.add_time(no + 1, "layout", layout_time)
+            self.stats.add_time(no + 1, "interpret", elapsed - layout_time)
+        return self.device.get_result()
+
+    def _iter_numbered_raw_pages(self, pages=None, workers=None,
+                                 predicate=None):
+        """Yield a (number, raw page) tuple for every page, see
+        :meth:`.iter_raw_pages`. Elements of skipped pages are None, their
+        size is taken from the media box. """
+        selection = self._iter_selected(pages, predicate)
+        if workers is not None and workers > 1:
+            for item in self._iter_raw_pages_parallel(selection, workers):
+                yield item
+            return
+
+        stats = self.stats
+        for no, page, selected in selection:
+            if not selected:
+                yield no, _page_size(page) + (None,)
+                continue
 
+            layout = self._process_page(no, page)
+            if stats is None:
+                elements = self._flatten(layout)
+            else:
+                start = timer()
+                elements = self._flatten(layout)
+                stats.add_time(no + 1, "flatten", timer() - start)
+                stats.page(no + 1).elements = len(elements)
+            yield no, (layout.width, layout.height, elements)
+
+    def _flatten(self, layout):
+        """Return a list of element tuples of a pdfminer layout object. """
+        if self.layout_analysis:
+            return list(self._parse_obj(layout._objs))
+
+        chars = []
+        elements = list(self._parse_obj(layout._objs, chars))
+        elements.extend(group_chars(chars, self.char_margin))
+        return elements
+
+    def iter_raw_pages(self, indices=None, workers=None, predicate=None):
+        """Yield a (width, height, elements) tuple for every page, where
+        elements is a list of (x1, y1, x2, y2, text) tuples in PDF notation.
+
+        This is the compact, picklable form of a page, which can be turned
+        into a :class:`.Document` with :meth:`.Document.from_raw_pages`.
+
+        :param indices: if given, parse only pages with those 0-based numbers,
+            see :meth:`.get_document`
+        :param workers: if greater than 1, pages are parsed in parallel by a
+            pool of that many processes, see :meth:`.get_document`
+        :param predicate: see :meth:`.get_document`
+        """
+        for no, raw_page in self._iter_numbered_raw_pages(
+                indices, workers, predicate):
+            if raw_page[2] is None:
+                continue
+            if self.stats is not None:
+                self.stats.page_done(no + 1)
+            yield raw_page
+
+    def count_pages(self):
+        """Return number of pages in the document. Pages are not parsed. """
+        from pdfminer.pdfpage import PDFPage
+        return sum(1 for _ in PDFPage.create_pages(self.document))
+
+    def get_document(self, workers=None, pages=None, predicate=None):
+        """Parse every page and return a sorted :class:`.Document`.
+
+        Pages can be selected with pages and predicate. Other pages are not
+        interpreted, nor analysed, but parsed pages keep their numbers
+        (see :attr:`.Page.number`) and positions in the document.
+
+        >>> parser.get_document(pages=[0, -2, -1])
+        >>> parser.get_document(predicate=lambda no, page: page.rotate == 0)
+
+        :param workers: if greater than 1, pages are parsed in parallel by a
+            pool of that many processes. Every process opens the file on its
+            own, so the speedup is noticeable for long documents only.
+        :param pages: iterable of 0-based page numbers, like a range. Negative
+            numbers count from the end of the document.
+        :param predicate: function called with a 0-based page number and
+            pdfminer PDFPage (with mediabox, rotate and attrs) before the page
+            is parsed; the page is skipped if it returns False
+        """
         ret = Document()
-        pages = PDFPage.create_pages(self.document)
-        for page in pages:
-            # read the page into a layout object
-            self.interpreter.process_page(page)
-            layout = self.device.get_result()
+        for no, raw_page in self._iter_numbered_raw_pages(
+                pages, workers, predicate):
+            width, height, elements = raw_page
+            if elements is None:
+                ret.skip_page(width, height)
+                continue
+            page = ret.add_page(width, height)
+            for elem in elements:
+                page.add_element(*elem)
+            self._sort_page(no, page)
+        return ret
 
-            page = ret.add_page(layout.width, layout.height)
+    def _sort_page(self, no, page):
+        """Sort and defragment a page, collecting stats if enabled. """
+        _sort_page(no, page, self.stats)
+
+    def _iter_raw_pages_parallel(self, selection, workers):
+        selection = [(no, _page_size(page), selected)
+                     for no, page, selected in selection]
+        indices = [no for no, size, selected in selection if selected]
+        count = len(indices)
+        parsed = iter(())
+        pool = None
+        source = temporary = None
+        if count:
+            # Split pages in contiguous ranges, a few per worker, so
+            # a process which got easy pages can pick up more work.
+            chunks = min(count, workers * 4)
+            source, temporary = _worker_source(self.fp)
+            tasks = []
+            for chunk in range(chunks):
+                start = count * chunk // chunks
+                stop = count * (chunk + 1) // chunks
+                tasks.append((source, self.char_margin, self.layout_analysis,
+                              indices[start:stop], self.stats is not None))
+            pool = Pool(min(workers, chunks))
+            parsed = self._merge_parallel(pool.imap(_parse_pages, tasks))
 
-            # extract text from this object
-            for elem in self._parse_obj(layout._objs):
-                page.add_element(*elem)
+        try:
+            for no, size, selected in selection:
+                if selected:
+                    yield next(parsed)
+                else:
+                    yield no, size + (None,)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            if temporary:
+                os.remove(source)
+
+    def _merge_parallel(self, results):
+        for raw_pages, stats in results:
+            if stats is not None:
+                self.stats.merge(stats)
+            for item in raw_pages:
+                yield item
+
+    def iter_pages(self, pages=None, predicate=None):
+        """Yield sorted and defragmented :class:`.Page` objects, one at a time,
+        as the document is being parsed.
+
+        Pages are not linked to each other nor to a :class:`.Document`, so
+        every page can be released as soon as the caller is done with it.
+        :meth:`.Page.position_in_document` still returns the same value as for
+        a page from :meth:`.get_document`.
+
+        >>> for page in DrunkenChildInTheFog(open("file.pdf")).iter_pages():
+        ...     page.containing_text("Total")
+
+        :param pages: see :meth:`.get_document`
+        :param predicate: see :meth:`.get_document`
+        """
+        offset = 0
+        for no, (width, height, elements) in self._iter_numbered_raw_pages(
+                pages, predicate=predicate):
+            if elements is not None:
+                page = Page(width, height, None, offset=offset,
+                            number=no + 1)
+                for elem in elements:
+                    page.add_element(*elem)
+
+                self._sort_page(no, page)
+                yield page
+            offset += width * 100 * height
+
+
+class Extractor:
+    """pdfminer resource manager, layout analysis device and interpreter,
+    reused by many :class:`.DrunkenChildInTheFog` objects, one document at
+    a time. Use a single extractor for a batch of files, one per thread or
+    process.
+
+    >>> extractor = Extractor()
+    >>> for name in names:
+    ...     document = extractor.get_document(name)
+
+    :param char_margin: see :class:`.DrunkenChildInTheFog`
+    :param layout_analysis: see :class:`.DrunkenChildInTheFog`
+    """
 
-        ret.sort()
-        return ret
+    def __init__(self, char_margin=1, layout_analysis=True):
+        from pdfminer.converter import PDFPageAggregator
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter
+        from pdfminer.pdfinterp import PDFResourceManager
+
+        self.char_margin = char_margin
+        self.layout_analysis = layout_analysis
+
+        # Create a PDF resource manager object that stores shared resources.
+        self.rsrcmgr = PDFResourceManager(caching=True)
+
+        # BEGIN LAYOUT ANALYSIS
+        # Set parameters for analysis.
+        self.laparams = None
+        if layout_analysis:
+            self.laparams = LAParams(char_margin=char_margin)
+
+        # Create a PDF page aggregator object.
+        self.device = PDFPageAggregator(self.rsrcmgr, laparams=self.laparams)
+
+        # Create a PDF interpreter object.
+        self.interpreter = PDFPageInterpreter(self.rsrcmgr, self.device)
+
+    def reset(self):
+        """Forget fonts of the previous document. The resource manager caches
+        them by object ids, which are local to a single PDF file, so they can
+        not be shared between files. CMaps are cached by pdfminer for the
+        whole process anyway. """
+        self.rsrcmgr._cached_fonts.clear()
+
+    def open(self, fp, stats=None):
+        """Return :class:`.DrunkenChildInTheFog` using this extractor. """
+        return DrunkenChildInTheFog(fp, stats=stats, extractor=self)
+
+    def get_document(self, fp, **kw):
+        """Parse a file and return a sorted :class:`.Document`, see
+        :meth:`.DrunkenChildInTheFog.get_document`. """
+        with self.open(fp) as parser:
+            return parser.get_document(**kw)
+
+    def iter_pages(self, fp, **kw):
+        """Yield pages of a file, see
+        :meth:`.DrunkenChildInTheFog.iter_pages`. """
+        with self.open(fp) as parser:
+            for page in parser.iter_pages(**kw):
+                yield page
@@ -0,0 +1,165 @@
+# -*- encoding: utf-8 -*-
+
+"""Streaming export of elements to CSV, JSON Lines and Parquet.
+
+Rows are made straight from element tuples of every page, as soon as the
+page is parsed; :class:`.Document`, :class:`.Page` and :class:`.Element`
+objects are never created, so memory use does not grow with the document.
+Rows are the same as elements of :meth:`.DrunkenChildInTheFog.get_document`:
+in page coordinates (with (0, 0) in the upper left corner), sorted and with
+line segments merged like by :meth:`.Page.defrag_lines`.
+
+>>> with open("out.csv", "w") as output:
+...     writer = CSVWriter(output)
+...     export("file.pdf", writer)
+...     writer.close()
+
+Parquet requires pyarrow (``pip install drunken_child_in_the_fog[parquet]``).
+"""
+
+import csv
+import json
+
+from drunken_child_in_the_fog.core import DrunkenChildInTheFog, KINDS, \
+    KIND_NAMES, TEXT, HORIZONTAL, _merge_lines, _path
+
+#: Columns of every row
+COLUMNS = ("file", "page", "x1", "y1", "x2", "y2", "kind", "text")
+
+
+def page_rows(name, number, width, height, elements):
+    """Return rows of a single raw page, see
+    :meth:`.DrunkenChildInTheFog.iter_raw_pages`.
+
+    :param name: value of the file column
+    :param number: 1-based page number
+    """
+    flipped = []
+    for x1, y1, x2, y2, text in elements:
+        flipped.append([x1, height - y2, x2, height - y1,
+                        KINDS.get(text, TEXT), text])
+
+    # Same order as Page.sort_elements
+    scale = width * 100
+    flipped.sort(key=lambda elem: scale * elem[1] + elem[0])
+
+    # Line segments merged like by Page.defrag_lines
+    ends, removed = _merge_lines(
+        (no, elem[4], elem[0], elem[1], elem[2], elem[3])
+        for no, elem in enumerate(flipped) if elem[4] != TEXT)
+    for no, end in ends.items():
+        flipped[no][2 if flipped[no][4] == HORIZONTAL else 3] = end
+
+    return [(name, number, x1, y1, x2, y2, KIND_NAMES[kind],
+             text if kind == TEXT else "")
+            for no, (x1, y1, x2, y2, kind, text) in enumerate(flipped)
+            if no not in removed]
+
+
+def iter_rows(parser, name, pages=None, predicate=None):
+    """Yield a list of rows for every page parsed by a
+    :class:`.DrunkenChildInTheFog`.
+
+    :param name: value of the file column
+    :param pages: see :meth:`.DrunkenChildInTheFog.get_document`
+    :param predicate: see :meth:`.DrunkenChildInTheFog.get_document`
+    """
+    for no, raw_page in parser._iter_numbered_raw_pages(
+            pages, predicate=predicate):
+        width, height, elements = raw_page
+        if elements is not None:
+            yield page_rows(name, no + 1, width, height, elements)
+
+
+def export(source, writer, name=None, pages=None, predicate=None, **kw):
+    """Parse a file and write its rows, page by page. Returns number of
+    written rows.
+
+    :param source: anything accepted by :class:`.DrunkenChildInTheFog`
+    :param writer: :class:`.CSVWriter`, :class:`.JSONLinesWriter` or
+        :class:`.ParquetWriter`; it is not closed
+    :param name: value of the file column, by default the name of source
+    :param kw: passed to :class:`.DrunkenChildInTheFog`, like char_margin
+    """
+    if name is None:
+        name = _path(source) or getattr(source, "name", "")
+    count = 0
+    with DrunkenChildInTheFog(source, **kw) as parser:
+        for rows in iter_rows(parser, name, pages, predicate):
+            writer.write(rows)
+            count += len(rows)
+    return count
+
+
+class JSONLinesWriter:
+    """Writes rows as JSON objects, one per line, to a text file. """
+
+    def __init__(self, output):
+        self.output = output
+
+    def write(self, rows):
+        for row in rows:
+            self.output.write(json.dumps(dict(zip(COLUMNS, row))))
+            self.output.write("\n")
+
+    def close(self):
+        self.output.flush()
+
+
+class CSVWriter:
+    """Writes rows as CSV with a header, to a text file opened with
+    newline="". """
+
+    def __init__(self, output):
+        self.output = output
+        self.writer = csv.writer(output)
+        self.writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.output.flush()
+
+
+class ParquetWriter:
+    """Writes rows to a Parquet file (a path or a binary file), one row
+    group for every call of :meth:`.write`. Requires pyarrow. """
+
+    def __init__(self, output):
+        import pyarrow
+        import pyarrow.parquet
+
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([
+            ("file", pyarrow.string()),
+            ("page", pyarrow.int32()),
+            ("x1", pyarrow.float64()),
+            ("y1", pyarrow.float64()),
+            ("x2", pyarrow.float64()),
+            ("y2", pyarrow.float64()),
+            ("kind", pyarrow.dictionary(pyarrow.int8(), pyarrow.string())),
+            ("text", pyarrow.string()),
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(output, self.schema)
+
+    def write(self, rows):
+        if not rows:
+            return
+        columns = [list(column) for column in zip(*rows)]
+        table = self.pyarrow.Table.from_arrays([
+            self.pyarrow.array(column, type=field.type)
+            if not self.pyarrow.types.is_dictionary(field.type)
+            else self.pyarrow.array(column).dictionary_encode().cast(
+                field.type)
+            for column, field in zip(columns, self.schema)],
+            schema=self.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        self.writer.close()
+
+
+#: Writer for every format name
+WRITERS = {"jsonl": JSONLinesWriter, "csv": CSVWriter,
+           "parquet": ParquetWriter}
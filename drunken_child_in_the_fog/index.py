@@ -0,0 +1,397 @@
+# -*- encoding: utf-8 -*-
+
+"""Indexes used to speed up queries on a :class:`.Page`. """
+
+import bisect
+import math
+import re
+
+# Average number of points in a single grid cell.
+POINTS_PER_CELL = 4
+
+
+class GridIndex:
+    """Uniform grid over a list of (x, y) points. Used to quickly find points
+    inside a rectangle. """
+
+    def __init__(self, points, width, height):
+        self.points = points
+
+        cells = max(1, len(points) // POINTS_PER_CELL)
+        area = max(width, 1) * max(height, 1)
+        self.cell_size = math.sqrt(area / float(cells))
+
+        self.buckets = {}
+        for no, (x, y) in enumerate(points):
+            cell = self._cell(x, y)
+            bucket = self.buckets.get(cell)
+            if bucket is None:
+                bucket = self.buckets[cell] = []
+            bucket.append(no)
+
+        #: Rectangle containing every point
+        self.box = None
+        if points:
+            xs = [x for x, y in points]
+            ys = [y for x, y in points]
+            self.box = min(xs), min(ys), max(xs), max(ys)
+
+    def _cell(self, x, y):
+        return (int(math.floor(x / self.cell_size)),
+                int(math.floor(y / self.cell_size)))
+
+    def query(self, x1, y1, x2, y2):
+        """Return a sorted list of numbers of points, which are inside the
+        rectangle (x1, y1), (x2, y2), borders included. """
+        if not self.points:
+            return []
+
+        # Clamped to the points, so infinite rectangles work too.
+        min_x, min_y, max_x, max_y = self.box
+        x1, y1 = max(x1, min_x), max(y1, min_y)
+        x2, y2 = min(x2, max_x), min(y2, max_y)
+        if x1 > x2 or y1 > y2:
+            return []
+
+        cx1, cy1 = self._cell(x1, y1)
+        cx2, cy2 = self._cell(x2, y2)
+
+        ret = []
+        points = self.points
+        buckets = self.buckets
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                for no in buckets.get((cx, cy), ()):
+                    x, y = points[no]
+                    if x1 <= x <= x2 and y1 <= y <= y2:
+                        ret.append(no)
+        ret.sort()
+        return ret
+
+
+class ElementIndex:
+    """Spatial index of elements of a single page. Answers
+    :class:`.BoxQuery` queries with the same results as a linear scan,
+    in the same order. """
+
+    def __init__(self, elements, width, height):
+        self.elements = elements
+        self.width = width
+        self.height = height
+        self.starts = GridIndex(
+            [(elem.x1, elem.y1) for elem in elements], width, height)
+        self._ends = None
+
+        # Elements larger than a few grid cells, like long lines, are
+        # checked by every :meth:`.nearest` query. Sizes of other elements
+        # are used to find those starting outside of, but reaching into
+        # a searched area.
+        limit = 2 * self.starts.cell_size
+        self.large = []
+        self.max_width = self.max_height = 0
+        for no, elem in enumerate(elements):
+            width = elem.x2 - elem.x1
+            height = elem.y2 - elem.y1
+            if width > limit or height > limit:
+                self.large.append(no)
+            else:
+                self.max_width = max(self.max_width, width)
+                self.max_height = max(self.max_height, height)
+        self._large = set(self.large)
+
+        xs = [elem.x1 for elem in elements] or [0]
+        ys = [elem.y1 for elem in elements] or [0]
+        self.extent = min(xs), min(ys), max(xs), max(ys)
+
+    @property
+    def ends(self):
+        if self._ends is None:
+            self._ends = GridIndex(
+                [(elem.x2, elem.y2) for elem in self.elements],
+                self.width, self.height)
+        return self._ends
+
+    def inside(self, box_query, f="whole_inside"):
+        """Return a list of elements matching box_query.
+
+        :param f: name of :class:`.BoxQuery` method, one of 'starts_inside',
+            'ends_inside', 'whole_inside'.
+        """
+        grid = self.ends if f == "ends_inside" else self.starts
+        fun = getattr(box_query, f)
+        elements = self.elements
+        ret = []
+        for no in grid.query(box_query.x1, box_query.y1,
+                             box_query.x2, box_query.y2):
+            element = elements[no]
+            if fun(element):
+                ret.append(element)
+        return ret
+
+    def _area(self, element, direction, tolerance, radius):
+        """Return a rectangle, where every element closer than radius starts.
+        """
+        x1 = element.x1 - radius - self.max_width
+        y1 = element.y1 - radius - self.max_height
+        x2 = element.x2 + radius
+        y2 = element.y2 + radius
+        if direction in ("right", "left"):
+            y1 = element.y1 - tolerance - self.max_height
+            y2 = element.y2 + tolerance
+            if direction == "right":
+                x1 = element.x2 - tolerance - self.max_width
+            else:
+                x2 = element.x1 + tolerance
+        elif direction in ("below", "above"):
+            x1 = element.x1 - tolerance - self.max_width
+            x2 = element.x2 + tolerance
+            if direction == "below":
+                y1 = element.y2 - tolerance - self.max_height
+            else:
+                y2 = element.y1 + tolerance
+        return x1, y1, x2, y2
+
+    def nearest(self, element, k=None, direction=None, tolerance=0,
+                accept=None):
+        """Return up to k elements nearest to element, closest first, see
+        :func:`.nearest`. Only grid cells around element are searched, in
+        a growing area, until k elements are found.
+
+        :param accept: if given, only elements for which it returns True are
+            returned
+        """
+        ex1, ey1, ex2, ey2 = self.extent
+        radius = self.starts.cell_size
+        while True:
+            x1, y1, x2, y2 = self._area(element, direction, tolerance, radius)
+            # Directional areas grow only in their direction.
+            complete = {
+                None: x1 <= ex1 and y1 <= ey1 and x2 >= ex2 and y2 >= ey2,
+                "right": x2 >= ex2,
+                "left": x1 <= ex1,
+                "below": y2 >= ey2,
+                "above": y1 <= ey1,
+            }[direction]
+
+            found = []
+            numbers = [no for no in self.starts.query(x1, y1, x2, y2)
+                       if no not in self._large]
+            for no in numbers + self.large:
+                other = self.elements[no]
+                if other is element:
+                    continue
+                distance = gap(element, other, direction, tolerance)
+                if distance is None or (distance > radius and not complete):
+                    continue
+                if accept is None or accept(other):
+                    found.append((distance, no, other))
+
+            if complete or (k is not None and len(found) >= k):
+                found.sort(key=lambda item: item[:2])
+                return [other for _, _, other in found[:k]]
+            radius *= 2
+
+
+#: Directions of :func:`.nearest`
+DIRECTIONS = ("right", "left", "below", "above")
+
+
+def _overlap(a1, a2, b1, b2, tolerance):
+    return a1 - tolerance <= b2 and b1 <= a2 + tolerance
+
+
+def gap(element, other, direction=None, tolerance=0):
+    """Return distance between element and other, or None if other is not in
+    the direction from element.
+
+    Coordinates grow down and right, like :class:`.Element` ones. Other is in
+    a direction if its center is, it does not overlap element by more than
+    tolerance, and is aligned with it: for 'right' and 'left' their vertical
+    ranges overlap, for 'below' and 'above' horizontal ones, allowing for
+    tolerance. For no direction, the distance is between closest points of
+    their boxes.
+    """
+    if direction is None:
+        dx = max(0, other.x1 - element.x2, element.x1 - other.x2)
+        dy = max(0, other.y1 - element.y2, element.y1 - other.y2)
+        return math.hypot(dx, dy)
+
+    if direction in ("right", "left"):
+        if not _overlap(element.y1, element.y2, other.y1, other.y2,
+                        tolerance):
+            return None
+        # Doubled centers
+        shift = (other.x1 + other.x2) - (element.x1 + element.x2)
+        if direction == "right":
+            distance = other.x1 - element.x2
+        else:
+            distance = element.x1 - other.x2
+            shift = -shift
+    elif direction in ("below", "above"):
+        if not _overlap(element.x1, element.x2, other.x1, other.x2,
+                        tolerance):
+            return None
+        shift = (other.y1 + other.y2) - (element.y1 + element.y2)
+        if direction == "below":
+            distance = other.y1 - element.y2
+        else:
+            distance = element.y1 - other.y2
+            shift = -shift
+    else:
+        raise ValueError("unknown direction: %r" % direction)
+
+    if distance < -tolerance or shift <= 0:
+        return None
+    return max(distance, 0)
+
+
+def nearest(elements, element, k=None, direction=None, tolerance=0):
+    """Return up to k (or all, if k is None) elements nearest to element,
+    closest first, by scanning every element. Elements at the same
+    distance are in the order of elements. See :func:`.gap` for direction
+    and tolerance. """
+    found = []
+    for no, other in enumerate(elements):
+        if other is element:
+            continue
+        distance = gap(element, other, direction, tolerance)
+        if distance is not None:
+            found.append((distance, no, other))
+    found.sort(key=lambda item: item[:2])
+    return [other for _, _, other in found[:k]]
+
+
+#: Length of n-grams stored in :class:`.TextIndex`
+NGRAM = 3
+
+WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def words(text):
+    """Return a list of words in text. """
+    return WORD.findall(text)
+
+
+def _fold(text):
+    return text.lower()
+
+
+def text_matcher(text, ignore_case=False):
+    """Return a function, checking if its argument contains text. """
+    if ignore_case:
+        text = _fold(text)
+        return lambda other: text in _fold(other)
+    return lambda other: text in other
+
+
+def word_matcher(word, ignore_case=False):
+    """Return a function, checking if its argument contains a whole word. """
+    if ignore_case:
+        word = _fold(word)
+        return lambda other: word in words(_fold(other))
+    return lambda other: word in words(other)
+
+
+def prefix_matcher(prefix, ignore_case=False):
+    """Return a function, checking if its argument contains a word starting
+    with prefix. """
+    if ignore_case:
+        prefix = _fold(prefix)
+
+    def matches(other):
+        if ignore_case:
+            other = _fold(other)
+        for word in words(other):
+            if word.startswith(prefix):
+                return True
+        return False
+    return matches
+
+
+class TextIndex:
+    """Inverted index of element texts, built of n-grams (for substring
+    queries) and words (for whole-word and prefix queries). Every query
+    returns elements in the same order as they are in the indexed list.
+
+    :param casefold: if True, the index is case-insensitive and can answer
+        both case-sensitive and case-insensitive queries. A case-sensitive
+        index is smaller, but case-insensitive queries scan every element.
+    """
+
+    def __init__(self, elements, casefold=True):
+        self.elements = elements
+        self.casefold = casefold
+        self.grams = {}
+        self.words = {}
+
+        for no, elem in enumerate(elements):
+            text = self._fold(elem.text)
+            grams = set(text[pos:pos + NGRAM]
+                        for pos in range(len(text) - NGRAM + 1))
+            for gram in grams:
+                self.grams.setdefault(gram, []).append(no)
+            for word in set(words(text)):
+                self.words.setdefault(word, []).append(no)
+
+        self.sorted_words = sorted(self.words)
+
+    def _fold(self, text):
+        if self.casefold:
+            return _fold(text)
+        return text
+
+    def _select(self, numbers, matches):
+        """Return elements with given numbers, which text matches. """
+        elements = self.elements
+        ret = []
+        for no in numbers:
+            element = elements[no]
+            if matches(element.text):
+                ret.append(element)
+        return ret
+
+    def _scan(self, matches):
+        return self._select(range(len(self.elements)), matches)
+
+    def containing(self, text, ignore_case=False):
+        """Return elements with text inside. """
+        matches = text_matcher(text, ignore_case)
+        if (ignore_case and not self.casefold) or len(text) < NGRAM:
+            return self._scan(matches)
+
+        query = self._fold(text)
+        postings = []
+        for pos in range(len(query) - NGRAM + 1):
+            numbers = self.grams.get(query[pos:pos + NGRAM])
+            if numbers is None:
+                return []
+            postings.append(numbers)
+        postings.sort(key=len)
+
+        numbers = set(postings[0])
+        for other in postings[1:]:
+            numbers.intersection_update(other)
+        return self._select(sorted(numbers), matches)
+
+    def containing_word(self, word, ignore_case=False):
+        """Return elements with a whole word in text. """
+        matches = word_matcher(word, ignore_case)
+        if ignore_case and not self.casefold:
+            return self._scan(matches)
+
+        return self._select(self.words.get(self._fold(word), []), matches)
+
+    def containing_prefix(self, prefix, ignore_case=False):
+        """Return elements with a word starting with prefix in text. """
+        matches = prefix_matcher(prefix, ignore_case)
+        if ignore_case and not self.casefold:
+            return self._scan(matches)
+
+        query = self._fold(prefix)
+        numbers = set()
+        pos = bisect.bisect_left(self.sorted_words, query)
+        while pos < len(self.sorted_words) and \
+                self.sorted_words[pos].startswith(query):
+            numbers.update(self.words[self.sorted_words[pos]])
+            pos += 1
+        return self._select(sorted(numbers), matches)
@@ -0,0 +1,134 @@
+# -*- encoding: utf-8 -*-
+
+"""Searching for many patterns at once.
+
+>>> matcher = TextMatcher(["Invoice no", "VAT", "Total"], ignore_case=True)
+>>> for document in documents:
+...     found = document.search_many(matcher)
+...     found["Total"].first()
+"""
+
+import re
+
+from drunken_child_in_the_fog.index import _fold
+
+#: More plain patterns than this are found with an Aho-Corasick automaton.
+#: Fewer are found with a regular expression, skipping elements containing
+#: none of them, and substring checks, which are faster for a few patterns.
+AUTOMATON_PATTERNS = 50
+
+
+class _Automaton:
+    """Aho-Corasick automaton, finding every one of many strings in a text,
+    in a single pass over it. """
+
+    def __init__(self, strings):
+        # Node 0 is the root. Every node has transitions, a failure link and
+        # numbers of strings ending there, including those ending at nodes
+        # reachable by failure links.
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+
+        for no, string in enumerate(strings):
+            node = 0
+            for char in string:
+                nxt = self.goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][char] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                node = nxt
+            self.out[node].append(no)
+
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, nxt in self.goto[node].items():
+                queue.append(nxt)
+                fail = self.fail[node]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                target = self.goto[fail].get(char, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, text):
+        """Return a set of numbers of strings found in text. """
+        goto = self.goto
+        fail = self.fail
+        out = self.out
+        found = set(out[0])
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class TextMatcher:
+    """Many patterns, compiled once and reusable for many documents.
+
+    :param patterns: iterable of strings
+    :param regex: if True, patterns are regular expressions, searched with
+        re.search, one after another. Otherwise elements containing a
+        pattern are found with an Aho-Corasick automaton, or substring checks
+        for at most :data:`AUTOMATON_PATTERNS` patterns.
+    :param ignore_case: if True, case is ignored
+    """
+
+    def __init__(self, patterns, regex=False, ignore_case=False):
+        self.patterns = list(patterns)
+        self.regex = regex
+        self.ignore_case = ignore_case
+
+        if regex:
+            flags = re.UNICODE | (re.IGNORECASE if ignore_case else 0)
+            self._compiled = [re.compile(pattern, flags)
+                              for pattern in self.patterns]
+        else:
+            strings = self.patterns
+            if ignore_case:
+                strings = [_fold(pattern) for pattern in strings]
+            self._strings = strings
+            self._automaton = None
+            self._any = None
+            if len(strings) > AUTOMATON_PATTERNS:
+                self._automaton = _Automaton(strings)
+            elif strings:
+                self._any = re.compile(
+                    "|".join(re.escape(string) for string in strings),
+                    re.UNICODE)
+
+    def find(self, text):
+        """Return a set of numbers of patterns found in text. """
+        if self.regex:
+            return set(no for no, compiled in enumerate(self._compiled)
+                       if compiled.search(text) is not None)
+
+        if self.ignore_case:
+            text = _fold(text)
+        if self._automaton is not None:
+            return self._automaton.find(text)
+        if self._any is None or self._any.search(text) is None:
+            return set()
+        return set(no for no, string in enumerate(self._strings)
+                   if string in text)
+
+    def search(self, elements):
+        """Return a dict mapping every pattern to a list of elements, which
+        text matches it, in the order of elements. """
+        found = [[] for _ in self.patterns]
+        find = self.find
+        for element in elements:
+            for no in find(element.text):
+                found[no].append(element)
+
+        ret = {}
+        for pattern, matching in zip(self.patterns, found):
+            ret.setdefault(pattern, matching)
+        return ret
@@ -0,0 +1,121 @@
+# -*- encoding: utf-8 -*-
+
+"""Per-page and per-stage statistics of parsing.
+
+>>> stats = ParseStats(callback=lambda page: print(page.as_dict()))
+>>> document = DrunkenChildInTheFog(fp, stats=stats).get_document()
+>>> stats.slowest(5)
+"""
+
+import json
+
+#: Stages of parsing a single page:
+#:
+#: * interpret - pdfminer interpretation of the page content,
+#: * layout - pdfminer layout analysis,
+#: * flatten - turning layout objects into element tuples,
+#: * sort - :meth:`.Page.sort_elements`,
+#: * defrag - :meth:`.Page.defrag_lines`.
+STAGES = ("interpret", "layout", "flatten", "sort", "defrag")
+
+
+class PageStats:
+    """Statistics of a single page. Times are in seconds. """
+
+    def __init__(self, number):
+        #: 1-based page number
+        self.number = number
+        self.times = dict((stage, 0.0) for stage in STAGES)
+        #: Number of elements found on the page
+        self.elements = 0
+        #: Number of lines after defragmentation
+        self.lines = 0
+        #: Number of line segments merged by defragmentation
+        self.merged_lines = 0
+
+    @property
+    def total(self):
+        return sum(self.times.values())
+
+    def as_dict(self):
+        ret = {
+            "page": self.number,
+            "total": self.total,
+            "elements": self.elements,
+            "lines": self.lines,
+            "merged_lines": self.merged_lines,
+        }
+        ret.update(self.times)
+        return ret
+
+    def __repr__(self):
+        return "<PageStats %s: %.3fs, %s elements>" % (
+            self.number, self.total, self.elements)
+
+
+class ParseStats:
+    """Statistics collected by :class:`.DrunkenChildInTheFog`, if passed as
+    its stats parameter. Collecting them is the only overhead; without it
+    the parser only checks if stats is None.
+
+    :param callback: called with :class:`.PageStats` of every page, as soon
+        as the page is done
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self._pages = {}
+
+    def page(self, number):
+        """Return :class:`.PageStats` of a page, created on first use. """
+        ret = self._pages.get(number)
+        if ret is None:
+            ret = self._pages[number] = PageStats(number)
+        return ret
+
+    def add_time(self, number, stage, seconds):
+        self.page(number).times[stage] += seconds
+
+    def merge(self, pages):
+        """Add :class:`.PageStats` collected elsewhere, for example in a
+        worker process. """
+        for page in pages:
+            self._pages[page.number] = page
+
+    def page_done(self, number):
+        if self.callback is not None:
+            self.callback(self.page(number))
+
+    @property
+    def pages(self):
+        """:class:`.PageStats` of every page, ordered by page number. """
+        return [self._pages[number] for number in sorted(self._pages)]
+
+    def totals(self):
+        """Return a dict with total time of every stage, elements and merged
+        lines of every page. """
+        ret = dict((stage, 0.0) for stage in STAGES)
+        ret.update(pages=0, elements=0, lines=0, merged_lines=0)
+        for page in self._pages.values():
+            for stage in STAGES:
+                ret[stage] += page.times[stage]
+            ret["pages"] += 1
+            ret["elements"] += page.elements
+            ret["lines"] += page.lines
+            ret["merged_lines"] += page.merged_lines
+        ret["total"] = sum(ret[stage] for stage in STAGES)
+        return ret
+
+    def slowest(self, count=10):
+        """Return :class:`.PageStats` of count slowest pages. """
+        return sorted(self._pages.values(), key=lambda page: -page.total)[
+            :count]
+
+    def as_dict(self):
+        return {
+            "totals": self.totals(),
+            "pages": [page.as_dict() for page in self.pages],
+        }
+
+    def to_json(self, **kw):
+        return json.dumps(self.as_dict(), **kw)
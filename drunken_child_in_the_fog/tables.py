@@ -0,0 +1,289 @@
+# -*- encoding: utf-8 -*-
+
+"""Reconstruction of ruled tables from horizontal and vertical lines.
+
+>>> for table in page.tables():
+...     for row in table.rows():
+...         print([cell.text for cell in row])
+"""
+
+import bisect
+
+from drunken_child_in_the_fog.core import ElementSet
+
+
+class Cell:
+    """Cell of a :class:`.Table`. Spanning cells have rowspan or colspan
+    greater than 1. """
+
+    def __init__(self, row, column, rowspan, colspan, x1, y1, x2, y2):
+        self.row = row
+        self.column = column
+        self.rowspan = rowspan
+        self.colspan = colspan
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+        self._elements = []
+
+    @property
+    def elements(self):
+        """:class:`.ElementSet` with text elements inside this cell. """
+        return ElementSet(self._elements)
+
+    @property
+    def text(self):
+        """Text of every element in this cell, separated by spaces. """
+        return " ".join(elem.text for elem in self._elements)
+
+    def __repr__(self):
+        return "<Cell %s,%s: %r>" % (self.row, self.column, self.text)
+
+
+class Table:
+    """Table found on a page. Grid lines are at x coordinates xs and y
+    coordinates ys. """
+
+    def __init__(self, xs, ys, cells, grid):
+        self.xs = xs
+        self.ys = ys
+        self.x1 = xs[0]
+        self.y1 = ys[0]
+        self.x2 = xs[-1]
+        self.y2 = ys[-1]
+        #: Every cell, ordered by row and column
+        self.cells = cells
+        self._grid = grid
+
+    @property
+    def row_count(self):
+        return len(self.ys) - 1
+
+    @property
+    def column_count(self):
+        return len(self.xs) - 1
+
+    def cell(self, row, column):
+        """Return :class:`.Cell` covering the given row and column. """
+        return self._grid[row][column]
+
+    def rows(self):
+        """Return a list of rows, every one being a list of cells starting in
+        that row. """
+        ret = [[] for _ in range(self.row_count)]
+        for cell in self.cells:
+            ret[cell.row].append(cell)
+        return ret
+
+    def columns(self):
+        """Return a list of columns, every one being a list of cells starting
+        in that column. """
+        ret = [[] for _ in range(self.column_count)]
+        for cell in sorted(self.cells, key=lambda c: (c.column, c.row)):
+            ret[cell.column].append(cell)
+        return ret
+
+    def _assign(self, element):
+        """Put element into the cell containing its center. Returns False if
+        the center is outside of this table. """
+        x = (element.x1 + element.x2) / 2.0
+        y = (element.y1 + element.y2) / 2.0
+        if not (self.x1 <= x <= self.x2 and self.y1 <= y <= self.y2):
+            return False
+
+        row = min(bisect.bisect_right(self.ys, y) - 1, self.row_count - 1)
+        column = min(bisect.bisect_right(self.xs, x) - 1,
+                     self.column_count - 1)
+        self._grid[row][column]._elements.append(element)
+        return True
+
+    def __repr__(self):
+        return "<Table %sx%s at %s, %s>" % (
+            self.row_count, self.column_count, self.x1, self.y1)
+
+
+class _UnionFind:
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        a = self.find(a)
+        b = self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+
+class _Snap:
+    """Clusters coordinates closer than tolerance. Every coordinate is
+    replaced by the mean of its cluster. """
+
+    def __init__(self, values, tolerance):
+        self.tolerance = tolerance
+        self.mapping = {}
+        cluster = []
+        for value in sorted(set(values)):
+            if cluster and value - cluster[-1] > tolerance:
+                self._add(cluster)
+                cluster = []
+            cluster.append(value)
+        if cluster:
+            self._add(cluster)
+        self.values = sorted(self.mapping)
+
+    def _add(self, cluster):
+        mean = sum(cluster) / float(len(cluster))
+        for value in cluster:
+            self.mapping[value] = mean
+
+    def __getitem__(self, value):
+        return self.mapping[value]
+
+    def nearest(self, value):
+        """Snap any value, for example end of a line, to the nearest
+        cluster if it is close enough. """
+        pos = bisect.bisect_left(self.values, value)
+        for candidate in self.values[max(pos - 1, 0):pos + 1]:
+            if abs(candidate - value) <= self.tolerance:
+                return self.mapping[candidate]
+        return value
+
+
+class _Coverage:
+    """Union of segments lying on the same line. """
+
+    def __init__(self, segments, tolerance):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(segments):
+            if self.ends and start <= self.ends[-1] + tolerance:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+        self.tolerance = tolerance
+
+    def covers(self, start, end):
+        pos = bisect.bisect_right(self.starts, start + self.tolerance) - 1
+        return pos >= 0 and self.ends[pos] >= end - self.tolerance
+
+
+def _coverage(segments, tolerance):
+    """Return a dict mapping fixed coordinate to :class:`._Coverage` of
+    (fixed, start, end) segments. """
+    grouped = {}
+    for fixed, start, end in segments:
+        grouped.setdefault(fixed, []).append((start, end))
+    return dict((fixed, _Coverage(group, tolerance))
+                for fixed, group in grouped.items())
+
+
+def _build_table(horizontal, vertical, tolerance):
+    """Build a :class:`.Table` from snapped (fixed, start, end) segments of a
+    single connected group of lines, or return None. """
+    ys = sorted(set(fixed for fixed, _, _ in horizontal))
+    xs = sorted(set(fixed for fixed, _, _ in vertical))
+    if len(xs) < 2 or len(ys) < 2:
+        return None
+
+    h_coverage = _coverage(horizontal, tolerance)
+    v_coverage = _coverage(vertical, tolerance)
+
+    rows = len(ys) - 1
+    columns = len(xs) - 1
+
+    # Grid cells not separated by a line belong to the same, spanning cell.
+    groups = _UnionFind(rows * columns)
+    for row in range(rows):
+        for column in range(columns):
+            no = row * columns + column
+            if column + 1 < columns and not v_coverage[xs[column + 1]].covers(
+                    ys[row], ys[row + 1]):
+                groups.union(no, no + 1)
+            if row + 1 < rows and not h_coverage[ys[row + 1]].covers(
+                    xs[column], xs[column + 1]):
+                groups.union(no, no + columns)
+
+    extents = {}
+    for row in range(rows):
+        for column in range(columns):
+            root = groups.find(row * columns + column)
+            r1, c1, r2, c2 = extents.get(root, (row, column, row, column))
+            extents[root] = (min(r1, row), min(c1, column),
+                             max(r2, row), max(c2, column))
+
+    cells = {}
+    for root, (r1, c1, r2, c2) in extents.items():
+        cells[root] = Cell(r1, c1, r2 - r1 + 1, c2 - c1 + 1,
+                           xs[c1], ys[r1], xs[c2 + 1], ys[r2 + 1])
+
+    grid = [[cells[groups.find(row * columns + column)]
+             for column in range(columns)] for row in range(rows)]
+    ordered = sorted(cells.values(), key=lambda cell: (cell.row, cell.column))
+    return Table(xs, ys, ordered, grid)
+
+
+def find_tables(page, tolerance=1):
+    """Return a list of :class:`.Table` found on page, ordered by their
+    position. Text elements are assigned to cells containing their centers.
+
+    :param page: sorted and defragmented :class:`.Page`
+    :param tolerance: lines closer than that are snapped together and
+        segments are treated as touching each other
+    """
+    horizontal = page.horizontal().all()
+    vertical = page.vertical().all()
+    if not horizontal or not vertical:
+        return []
+
+    snap_y = _Snap([line.y1 for line in horizontal], tolerance)
+    snap_x = _Snap([line.x1 for line in vertical], tolerance)
+
+    h_segments = [(snap_y[line.y1], snap_x.nearest(line.x1),
+                   snap_x.nearest(line.x2)) for line in horizontal]
+    v_segments = [(snap_x[line.x1], snap_y.nearest(line.y1),
+                   snap_y.nearest(line.y2)) for line in vertical]
+
+    # Group lines crossing each other. Horizontal lines are sorted by y, so
+    # for every vertical line only the horizontal ones in its range are
+    # checked.
+    count = len(h_segments)
+    groups = _UnionFind(count + len(v_segments))
+    order = sorted(range(count), key=lambda no: h_segments[no][0])
+    h_ys = [h_segments[no][0] for no in order]
+    for v_no, (x, y1, y2) in enumerate(v_segments):
+        start = bisect.bisect_left(h_ys, y1 - tolerance)
+        stop = bisect.bisect_right(h_ys, y2 + tolerance)
+        for no in order[start:stop]:
+            _, x1, x2 = h_segments[no]
+            if x1 - tolerance <= x <= x2 + tolerance:
+                groups.union(no, count + v_no)
+
+    components = {}
+    for no, segment in enumerate(h_segments):
+        components.setdefault(groups.find(no), ([], []))[0].append(segment)
+    for no, segment in enumerate(v_segments):
+        components.setdefault(groups.find(count + no), ([], []))[1].append(
+            segment)
+
+    tables = []
+    for h_group, v_group in components.values():
+        table = _build_table(h_group, v_group, tolerance)
+        if table is not None:
+            tables.append(table)
+    tables.sort(key=lambda table: (table.y1, table.x1))
+
+    for element in page.everything().text():
+        for table in tables:
+            if table._assign(element):
+                break
+
+    return tables
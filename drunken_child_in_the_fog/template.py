@@ -0,0 +1,190 @@
+# -*- encoding: utf-8 -*-
+
+"""Extraction templates, for many files with the same layout.
+
+>>> template = Template([
+...     Region("number", BoxQuery(400, 40, 560, 60), page=1),
+...     Anchor("total", "Total:", direction="right"),
+... ])
+>>> for name in names:
+...     with DrunkenChildInTheFog(name) as parser:
+...         found = template.extract(parser)
+...     found["total"].first().text
+
+Fields are compiled once, for every referenced page. Anchors of a page are
+all found in a single pass over its text, regions are answered by the page
+spatial index. Pages not referenced by any field are skipped, and not parsed
+at all by :meth:`.Template.extract`.
+"""
+
+from drunken_child_in_the_fog.core import ElementSet, TEXT
+from drunken_child_in_the_fog.index import DIRECTIONS
+from drunken_child_in_the_fog.search import TextMatcher
+
+
+class Field:
+    """Field of a :class:`.Template`.
+
+    :param name: key of the field in results
+    :param page: 1-based page number (see :attr:`.Page.number`), or None
+        for every page
+    """
+
+    def __init__(self, name, page=None):
+        if page is not None and page < 1:
+            raise ValueError("invalid page number: %r" % page)
+        self.name = name
+        self.page = page
+
+
+class Region(Field):
+    """Elements inside of a box.
+
+    :param box_query: :class:`.BoxQuery`
+    :param f: one of :attr:`.ElementSet.INDEXED_QUERIES`, like for
+        :meth:`.ElementSet.inside`
+    :param text_only: if True, lines are ignored
+    """
+
+    def __init__(self, name, box_query, page=None, f="whole_inside",
+                 text_only=True):
+        if f not in ElementSet.INDEXED_QUERIES:
+            raise ValueError("unknown query: %r" % f)
+        Field.__init__(self, name, page)
+        self.box_query = box_query
+        self.f = f
+        self.text_only = text_only
+
+
+class Anchor(Field):
+    """Text elements next to an anchor. Every text element containing text
+    is an anchor, see :meth:`.ElementSet.containing_text`.
+
+    :param text: text of the anchor
+    :param direction: one of 'right', 'left', 'below', 'above', or None,
+        see :meth:`.ElementSet.nearest`
+    :param k: number of elements taken for every anchor, closest first;
+        every element in direction, if None
+    :param tolerance: see :meth:`.ElementSet.nearest`
+    :param ignore_case: if True, case of the anchor text is ignored
+    """
+
+    def __init__(self, name, text, direction="right", page=None, k=1,
+                 tolerance=0, ignore_case=False):
+        if direction is not None and direction not in DIRECTIONS:
+            raise ValueError("unknown direction: %r" % direction)
+        Field.__init__(self, name, page)
+        self.text = text
+        self.direction = direction
+        self.k = k
+        self.tolerance = tolerance
+        self.ignore_case = ignore_case
+
+
+class Template:
+    """Named fields, applied to a :class:`.Document`, pages or a parser.
+    A template can be reused for any number of files.
+
+    :param fields: list of :class:`.Region` and :class:`.Anchor`; names must
+        be unique
+    """
+
+    def __init__(self, fields):
+        self.fields = list(fields)
+        names = [field.name for field in self.fields]
+        if len(set(names)) != len(names):
+            raise ValueError("field names must be unique")
+
+        numbers = set(field.page for field in self.fields)
+        #: Sorted 1-based numbers of referenced pages, or None if some field
+        #: is on every page
+        self.pages = None if None in numbers else sorted(numbers)
+        self._numbers = numbers
+        self._compiled = {}
+
+    def _compile(self, number):
+        """Return (regions, matchers) of fields on a page, compiled once for
+        every referenced page and once for all other pages. """
+        if number not in self._numbers:
+            number = None
+        ret = self._compiled.get(number)
+        if ret is not None:
+            return ret
+
+        fields = [field for field in self.fields
+                  if field.page is None or field.page == number]
+        regions = [field for field in fields if isinstance(field, Region)]
+
+        # A single matcher finds every anchor, for either case setting.
+        groups = {}
+        for field in fields:
+            if isinstance(field, Anchor):
+                groups.setdefault(field.ignore_case, []).append(field)
+        matchers = [(TextMatcher([field.text for field in group],
+                                 ignore_case=ignore_case), group)
+                    for ignore_case, group in sorted(groups.items())]
+
+        ret = self._compiled[number] = (regions, matchers)
+        return ret
+
+    def _apply_page(self, page, found):
+        """Add elements of every field found on page to found. """
+        regions, matchers = self._compile(page.number)
+        if regions:
+            index = page.index()
+            for field in regions:
+                elements = index.inside(field.box_query, field.f)
+                if field.text_only:
+                    elements = [elem for elem in elements
+                                if elem.kind == TEXT]
+                found[field.name].extend(elements)
+
+        anchors = []
+        if matchers:
+            for elem in page.elements:
+                if elem.kind != TEXT:
+                    continue
+                for matcher, group in matchers:
+                    for no in matcher.find(elem.text):
+                        anchors.append((group[no], elem))
+
+        if anchors:
+            text = page.everything().text()
+            for field, anchor in anchors:
+                found[field.name].extend(text.nearest(
+                    anchor, field.k, field.direction, field.tolerance))
+
+    def apply_pages(self, pages):
+        """Apply the template to pages, ordered by their numbers, like these
+        of :meth:`.DrunkenChildInTheFog.iter_pages`. Pages not referenced by
+        any field are skipped; iteration stops after the last referenced
+        page.
+
+        :return: dict mapping every field name to :class:`.ElementSet` of
+            elements found, in page order
+        """
+        found = dict((field.name, []) for field in self.fields)
+        last = self.pages[-1] if self.pages else None
+        for page in pages:
+            if last is not None:
+                if page.number > last:
+                    break
+                if page.number not in self._numbers:
+                    continue
+            self._apply_page(page, found)
+        return dict((name, ElementSet(elements))
+                    for name, elements in found.items())
+
+    def apply(self, document):
+        """Apply the template to a :class:`.Document`, see
+        :meth:`.apply_pages`. """
+        return self.apply_pages(document.get_pages())
+
+    def extract(self, parser):
+        """Parse pages referenced by the template with a
+        :class:`.DrunkenChildInTheFog` and apply the template to them, see
+        :meth:`.apply_pages`. Other pages are not parsed. """
+        indices = None
+        if self.pages is not None:
+            indices = [number - 1 for number in self.pages]
+        return self.apply_pages(parser.iter_pages(pages=indices))
@@ -0,0 +1,80 @@
+# -*- encoding: utf-8 -*-
+
+"""Grouping of single characters into horizontal text lines, used instead of
+pdfminer layout analysis by :class:`.DrunkenChildInTheFog` with
+layout_analysis=False.
+
+Parameters have the same meaning as in pdfminer LAParams, but characters are
+sorted once by their position, instead of being compared with each other.
+"""
+
+#: Characters overlapping vertically by more than this part of the lower one
+#: are in the same row, see LAParams.line_overlap
+LINE_OVERLAP = 0.5
+
+#: Space is inserted between characters further away than this part of the
+#: character size, see LAParams.word_margin
+WORD_MARGIN = 0.1
+
+
+def _rows(chars, line_overlap):
+    """Split characters into rows, from the top of the page. """
+    rows = []
+    row = top = bottom = None
+    for char in sorted(chars, key=lambda c: (-(c[1] + c[3]), c[0])):
+        y1, y2 = char[1], char[3]
+        if row is not None:
+            overlap = min(y2, top) - max(y1, bottom)
+            if overlap > line_overlap * min(y2 - y1, top - bottom):
+                row.append(char)
+                continue
+        row = [char]
+        rows.append(row)
+        bottom, top = y1, y2
+    return rows
+
+
+def _line(chars):
+    x1 = min(char[0] for char in chars)
+    y1 = min(char[1] for char in chars)
+    x2 = max(char[2] for char in chars)
+    y2 = max(char[3] for char in chars)
+    return x1, y1, x2, y2
+
+
+def group_chars(chars, char_margin=1, line_overlap=LINE_OVERLAP,
+                word_margin=WORD_MARGIN):
+    """Group characters into lines of text.
+
+    :param chars: list of (x1, y1, x2, y2, text) tuples of single characters
+    :param char_margin: characters closer than this part of the wider one are
+        in the same line, see LAParams.char_margin
+    :return: list of (x1, y1, x2, y2, text) tuples, one for every line
+        with some text other than whitespace
+    """
+    ret = []
+    for row in _rows(chars, line_overlap):
+        row.sort(key=lambda c: c[0])
+
+        line = [row[0]]
+        text = [row[0][4]]
+        for char in row[1:]:
+            x1, y1, x2, y2, char_text = char
+            last = line[-1]
+            width = x2 - x1
+            gap = x1 - last[2]
+            if gap >= max(width, last[2] - last[0]) * char_margin:
+                ret.append(_line(line) + ("".join(text),))
+                line = [char]
+                text = [char_text]
+                continue
+
+            if gap > word_margin * max(width, y2 - y1) and \
+                    not text[-1].endswith(" ") and char_text != " ":
+                text.append(" ")
+            line.append(char)
+            text.append(char_text)
+        ret.append(_line(line) + ("".join(text),))
+
+    return [line[:4] + (line[4].strip(),) for line in ret
+            if line[4].strip()]
@@ -13,6 +13,11 @@ requirements = [
     'pdfminer.six==20170419'
 ]
 
+extra_requirements = {
+    'numpy': ['numpy'],
+    'parquet': ['pyarrow'],
+}
+
 test_requirements = [
     # TODO: put package test requirements here
 ]
@@ -38,6 +43,7 @@ setup(
     },
     include_package_data=True,
     install_requires=requirements,
+    extras_require=extra_requirements,
     license="MIT license",
     zip_safe=False,
     keywords='drunken_child_in_the_fog',
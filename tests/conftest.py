@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+import sys
+
+collect_ignore = []
+if sys.version_info < (3, 6):
+    # drunken_child_in_the_fog.aio uses async generators.
+    collect_ignore.append("test_aio.py")
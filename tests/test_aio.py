@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_aio
+--------
+
+Tests for `drunken_child_in_the_fog.aio` module. Collected on Python 3.6
+and newer only, see conftest.py.
+"""
+import asyncio
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import pytest
+
+from benchmarks.synthetic import make_pdf
+from drunken_child_in_the_fog import aio
+from drunken_child_in_the_fog.aio import AsyncParser, aparse
+from drunken_child_in_the_fog.core import DrunkenChildInTheFog, Extractor
+from drunken_child_in_the_fog.stats import ParseStats
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+def _collect_async(loop, pages):
+    ret = []
+    while True:
+        try:
+            ret.append(loop.run_until_complete(pages.__anext__()))
+        except StopAsyncIteration:
+            return ret
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_aio(loop, processes):
+    data = make_pdf(pages=10, text_lines=3, rows=2, columns=2)
+    expected = DrunkenChildInTheFog(BytesIO(data)).get_document()
+    executor = ProcessPoolExecutor(2) if processes else None
+    try:
+        document = loop.run_until_complete(aparse(BytesIO(data), executor))
+        assert [str(e) for e in document.everything()] == \
+            [str(e) for e in expected.everything()]
+
+        parser = AsyncParser(executor, max_documents=1)
+        pages = _collect_async(loop, parser.iter_pages(BytesIO(data)))
+        assert [page.number for page in pages] == list(range(1, 11))
+        assert [page.position_in_document() for page in pages] == \
+            [page.position_in_document() for page in expected.get_pages()]
+        assert [str(e) for e in pages[9].everything()] == \
+            [str(e) for e in expected.get_page(10).everything()]
+
+        # Leaving the loop early releases the document slot.
+        pages = parser.iter_pages(BytesIO(data))
+        assert loop.run_until_complete(pages.__anext__()).number == 1
+        loop.run_until_complete(pages.aclose())
+        loop.run_until_complete(
+            asyncio.wait_for(parser.parse(BytesIO(data)), 30))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def test_aio_processes_temporary_file(loop, tmpdir, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmpdir))
+
+    # The file is written and removed out of the event loop.
+    threads = []
+
+    def record(function):
+        def wrapper(*args):
+            threads.append(threading.current_thread())
+            return function(*args)
+        return wrapper
+
+    for name in ("_worker_source", "_remove_when_done"):
+        monkeypatch.setattr(aio, name, record(getattr(aio, name)))
+
+    data = make_pdf(pages=20, text_lines=3, rows=2, columns=2)
+    executor = ProcessPoolExecutor(2)
+    try:
+        parser = AsyncParser(executor)
+        document = loop.run_until_complete(parser.parse(BytesIO(data)))
+        assert len(document.get_pages()) == 20
+        assert len(threads) == 2
+        assert threading.main_thread() not in threads
+
+        # Leaving early removes the file once running tasks are done.
+        pages = parser.iter_pages(BytesIO(data))
+        loop.run_until_complete(pages.__anext__())
+        loop.run_until_complete(pages.aclose())
+        for _ in range(100):
+            if not tmpdir.listdir():
+                break
+            time.sleep(0.05)
+        assert tmpdir.listdir() == []
+    finally:
+        executor.shutdown()
+
+
+def test_aio_processes_stats(loop):
+    data = make_pdf(pages=10, text_lines=3, rows=2, columns=2)
+    done = []
+    stats = ParseStats(callback=lambda page: done.append(page.number))
+    executor = ProcessPoolExecutor(2)
+    try:
+        parser = AsyncParser(executor, stats=stats)
+        loop.run_until_complete(parser.parse(BytesIO(data)))
+        assert done == list(range(1, 11))
+        assert [page.number for page in stats.pages] == list(range(1, 11))
+        assert stats.totals()["interpret"] > 0
+
+        with pytest.raises(ValueError):
+            AsyncParser(executor, extractor=Extractor())
+    finally:
+        executor.shutdown()
+
+
+def test_aio_extractor(loop):
+    first = make_pdf(pages=5, text_lines=3, rows=2, columns=2)
+    second = make_pdf(pages=8, text_lines=4, rows=3, columns=2)
+    expected = [DrunkenChildInTheFog(BytesIO(data)).get_document()
+                for data in (first, second)]
+
+    with pytest.raises(ValueError):
+        AsyncParser(extractor=Extractor())
+
+    # Documents sharing the extractor are parsed one after another.
+    parser = AsyncParser(extractor=Extractor(), max_documents=1)
+
+    async def parse_both():
+        return await asyncio.gather(
+            parser.parse(BytesIO(first)), parser.parse(BytesIO(second)))
+
+    documents = loop.run_until_complete(parse_both())
+    for document, other in zip(documents, expected):
+        assert [str(e) for e in document.everything()] == \
+            [str(e) for e in other.everything()]
+
+
+def test_aio_cancel(loop):
+    done = []
+    parser = AsyncParser(stats=ParseStats(callback=done.append))
+
+    task = loop.create_task(parser.parse(BytesIO(make_pdf(pages=50))))
+    loop.run_until_complete(asyncio.sleep(0.2))
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        loop.run_until_complete(task)
+
+    # The page being parsed is finished, no other page is started.
+    loop.run_until_complete(asyncio.sleep(0.5))
+    count = len(done)
+    loop.run_until_complete(asyncio.sleep(0.2))
+    assert len(done) == count < 50
@@ -7,12 +7,29 @@ test_drunken_child_in_the_fog
 
 Tests for `drunken_child_in_the_fog` module.
 """
+import csv
+import json
 import os
+import random
+import sys
+import tempfile
+from io import BytesIO
 
 import pytest
 
+from benchmarks.synthetic import make_pdf
+from drunken_child_in_the_fog import cli
+from drunken_child_in_the_fog.cache import DocumentCache
+from drunken_child_in_the_fog.export import COLUMNS, CSVWriter, \
+    JSONLinesWriter, export, page_rows
+from drunken_child_in_the_fog.search import AUTOMATON_PATTERNS, \
+    TextMatcher, _Automaton
+from drunken_child_in_the_fog.template import Template, Region, Anchor
+from drunken_child_in_the_fog.textlines import group_chars
+from drunken_child_in_the_fog.stats import ParseStats, STAGES
 from drunken_child_in_the_fog.core import DrunkenChildInTheFog, NoSuchElement, \
-    BoxQuery
+    BoxQuery, ElementSet, TEXT, HORIZONTAL, VERTICAL, HORIZONTAL_LINE, \
+    VERTICAL_LINE, KIND_NAMES, Document, Page, Extractor, _worker_source
 
 
 @pytest.fixture
@@ -55,3 +72,801 @@ def test_file_generated_from_pages(test_file_2):
 
     e = document.everything()
     assert e.count() > 0
+
+
+def test_iter_pages(test_file_2):
+    pages = list(DrunkenChildInTheFog(test_file_2).iter_pages())
+    assert len(pages) == 1
+
+    test_file_2.seek(0)
+    document = DrunkenChildInTheFog(test_file_2).get_document()
+    expected = document.get_pages()[0]
+
+    assert [str(e) for e in pages[0].everything()] == \
+        [str(e) for e in expected.everything()]
+    assert pages[0].position_in_document() == \
+        expected.position_in_document()
+
+
+def test_get_document_workers(test_file_2):
+    document = DrunkenChildInTheFog(test_file_2).get_document(workers=2)
+
+    test_file_2.seek(0)
+    expected = DrunkenChildInTheFog(test_file_2).get_document()
+
+    assert [str(e) for e in document.everything()] == \
+        [str(e) for e in expected.everything()]
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_get_document_pages(workers):
+    data = make_pdf(pages=5, text_lines=3, rows=2, columns=2)
+    expected = DrunkenChildInTheFog(BytesIO(data)).get_document().get_pages()
+
+    document = DrunkenChildInTheFog(BytesIO(data)).get_document(
+        workers=workers, pages=[0, -2, -1])
+    pages = document.get_pages()
+    assert [page.number for page in pages] == [1, 4, 5]
+    for page in pages:
+        other = expected[page.number - 1]
+        assert page.position_in_document() == other.position_in_document()
+        assert [str(e) for e in page.everything()] == \
+            [str(e) for e in other.everything()]
+    assert document.get_page(4) is pages[1]
+    with pytest.raises(NoSuchElement):
+        document.get_page(2)
+
+    seen = []
+
+    def predicate(no, page):
+        seen.append(no)
+        return no % 2 == 1
+
+    pages = list(DrunkenChildInTheFog(BytesIO(data)).iter_pages(
+        pages=range(4), predicate=predicate))
+    assert seen == [0, 1, 2, 3]
+    assert [page.number for page in pages] == [2, 4]
+    assert pages[1].position_in_document() == \
+        expected[3].position_in_document()
+
+
+def test_no_layout_analysis(test_file_2):
+    data = make_pdf(pages=2, text_lines=5, rows=3, columns=3)
+    for fp in (test_file_2, BytesIO(data)):
+        fp.seek(0)
+        expected = DrunkenChildInTheFog(fp).get_document()
+        fp.seek(0)
+        parser = DrunkenChildInTheFog(fp, layout_analysis=False)
+        document = parser.get_document()
+        assert [str(e) for e in document.everything()] == \
+            [str(e) for e in expected.everything()]
+
+
+def test_group_chars():
+    chars = [(10, 0, 15, 10, "b"), (0, 0, 5, 10, "a"), (7, 0, 10, 10, "c"),
+             (40, 1, 45, 11, "d"), (0, 20, 5, 30, "e"), (20, 0, 25, 10, " ")]
+    assert group_chars(chars) == [
+        (0, 20, 5, 30, "e"), (0, 0, 15, 10, "a cb"), (40, 1, 45, 11, "d")]
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_stats(test_file_2, workers):
+    done = []
+    stats = ParseStats(callback=done.append)
+    document = DrunkenChildInTheFog(test_file_2, stats=stats).get_document(
+        workers=workers)
+
+    assert [page.number for page in done] == [1]
+    page_stats = stats.pages[0]
+    assert page_stats.elements > 0
+    assert page_stats.merged_lines > 0
+    assert page_stats.lines == document.everything().lines().count()
+    for stage in STAGES:
+        assert page_stats.times[stage] >= 0
+    assert page_stats.times["interpret"] > 0
+
+    totals = stats.totals()
+    assert totals["pages"] == 1
+    assert totals["total"] == pytest.approx(page_stats.total)
+    assert json.loads(stats.to_json())["pages"][0]["page"] == 1
+    assert stats.slowest(1) == [page_stats]
+
+
+@pytest.mark.parametrize("kind", ["bytes", "bytearray", "memoryview",
+                                  "path", "fspath"])
+def test_inputs(test_file_2, kind):
+    if kind == "bytes" and sys.version_info < (3,):
+        pytest.skip("bytes are paths on Python 2")
+    data = test_file_2.read()
+    expected = DrunkenChildInTheFog(BytesIO(data)).get_document()
+
+    source = {
+        "bytes": data,
+        "bytearray": bytearray(data),
+        "memoryview": memoryview(data),
+        "path": test_file_2.name,
+    }.get(kind)
+    if kind == "fspath":
+        pathlib = pytest.importorskip("pathlib")
+        source = pathlib.Path(test_file_2.name)
+
+    for workers in (None, 2):
+        with DrunkenChildInTheFog(source) as parser:
+            document = parser.get_document(workers=workers)
+        assert [str(e) for e in document.everything()] == \
+            [str(e) for e in expected.everything()]
+
+
+def test_buffer_reader():
+    from drunken_child_in_the_fog.core import _BufferReader
+
+    fp = _BufferReader(memoryview(b"0123456789"))
+    assert fp.read(3) == b"012"
+    assert fp.seek(-2, os.SEEK_END) == 8
+    assert fp.read() == b"89"
+    assert fp.read(5) == b""
+    fp.seek(2, os.SEEK_SET)
+    fp.seek(3, os.SEEK_CUR)
+    assert (fp.tell(), fp.read(2)) == (5, b"56")
+
+
+def test_close(test_file_2):
+    parser = DrunkenChildInTheFog(test_file_2)
+    parser.close()
+    assert not test_file_2.closed
+
+    with pytest.raises(TypeError):
+        DrunkenChildInTheFog(1234)
+
+
+def test_extractor(test_file, test_file_2):
+    extractor = Extractor(char_margin=1)
+    for fp in (test_file, test_file_2, test_file):
+        fp.seek(0)
+        document = extractor.get_document(fp)
+        assert extractor.rsrcmgr._cached_fonts
+
+        fp.seek(0)
+        expected = DrunkenChildInTheFog(fp).get_document()
+        assert [str(e) for e in document.everything()] == \
+            [str(e) for e in expected.everything()]
+
+    # Fonts are cached by object ids of a single file.
+    test_file.seek(0)
+    parser = extractor.open(test_file)
+    assert parser.device is extractor.device
+    assert not extractor.rsrcmgr._cached_fonts
+
+
+def test_get_document_workers_from_memory(test_file_2, tmpdir,
+                                          monkeypatch):
+    # Workers read the file from a temporary copy, removed afterwards.
+    monkeypatch.setattr(tempfile, "tempdir", str(tmpdir))
+    fp = BytesIO(test_file_2.read())
+    document = DrunkenChildInTheFog(fp).get_document(workers=2)
+    assert document.everything().containing_text("two tables").count() == 1
+    assert tmpdir.listdir() == []
+
+    path, temporary = _worker_source(bytearray(b"%PDF"))
+    assert temporary and open(path, "rb").read() == b"%PDF"
+    os.remove(path)
+    assert _worker_source(test_file_2) == (test_file_2.name, False)
+
+
+def test_document_cache(test_file_2, tmpdir, monkeypatch):
+    cache = DocumentCache(str(tmpdir))
+    document = cache.get_document(test_file_2)
+    assert len(tmpdir.listdir()) == 1
+
+    # Cache hit does not touch pdfminer at all
+    monkeypatch.setitem(sys.modules, "pdfminer", None)
+    cached = cache.get_document(test_file_2)
+
+    assert [str(e) for e in cached.everything()] == \
+        [str(e) for e in document.everything()]
+    assert cached.get_pages()[0].width == document.get_pages()[0].width
+
+
+def test_document_cache_eviction(test_file, test_file_2, tmpdir):
+    cache = DocumentCache(str(tmpdir), max_size=1)
+    cache.get_document(test_file)
+    cache.get_document(test_file_2)
+    assert len(tmpdir.listdir()) == 0
+
+    cache.max_size = 1024 * 1024
+    cache.get_document(test_file)
+    assert cache.get_document(test_file, char_margin=2)
+    assert len(tmpdir.listdir()) == 2
+
+
+@pytest.mark.parametrize("f", ["starts_inside", "ends_inside", "whole_inside"])
+def test_page_index(test_file_2, f):
+    page = DrunkenChildInTheFog(test_file_2).get_document().get_pages()[0]
+    elements = page.everything().all()
+
+    rnd = random.Random(f)
+    for _ in range(200):
+        x1, x2 = sorted(rnd.uniform(-10, page.width + 10) for _ in range(2))
+        y1, y2 = sorted(rnd.uniform(-10, page.height + 10) for _ in range(2))
+        flags = [rnd.choice([True, False]) for _ in range(4)]
+        box = BoxQuery(x1, y1, x2, y2, *flags, fuzzy_border=rnd.choice([0, 2]))
+
+        expected = ElementSet(elements).inside(box, f).all()
+        assert page.inside(box, f).all() == expected
+
+    # Border semantics are kept for elements exactly on the border
+    elem = page.lines().first()
+    assert elem in page.inside(BoxQuery(elem.x1, elem.y1, elem.x2, elem.y2))
+    assert elem not in page.inside(BoxQuery(
+        elem.x1, elem.y1, elem.x2 + 1, elem.y2 + 1, include_left=False))
+    assert page.starting_from(0, 0).count() == page.everything().count()
+
+    inf = float("inf")
+    unbounded = BoxQuery(-inf, -inf, inf, inf)
+    assert page.inside(unbounded, f).all() == elements
+    assert page.inside(BoxQuery(0, 0, inf, inf), f).all() == \
+        ElementSet(elements).inside(BoxQuery(0, 0, inf, inf), f).all()
+
+
+def test_columnar_element_set(test_file_2):
+    columnar = pytest.importorskip("drunken_child_in_the_fog.columnar")
+
+    e = DrunkenChildInTheFog(test_file_2).get_document().everything()
+    c = columnar.ColumnarElementSet(e)
+
+    assert c.all() == e.all()
+    assert list(c) == list(e)
+    assert c.count() == e.count()
+    assert c.lines().all() == e.lines().all()
+    assert c.vertical().all() == e.vertical().all()
+    assert c.horizontal().all() == e.horizontal().all()
+    assert c.text().all() == e.text().all()
+    assert c.containing_text("test").all() == e.containing_text("test").all()
+    assert c.text().first() == e.text().first()
+    assert c.text().second() == e.text().second()
+    with pytest.raises(NoSuchElement):
+        c.containing_text("two tables").second()
+
+    for query in ["test", "TEST", "tab", "tables", "nothing", ""]:
+        for ignore_case in [False, True]:
+            for method in ["containing_text", "containing_word",
+                           "containing_prefix"]:
+                assert getattr(c, method)(query, ignore_case).all() == \
+                    getattr(e, method)(query, ignore_case).all()
+
+    for element in e.all()[::5]:
+        for direction in (None, "right", "left", "below", "above"):
+            for k in (1, 3, None):
+                assert c.nearest(element, k, direction).all() == \
+                    e.nearest(element, k, direction).all()
+        assert c.text().right_of(element).all() == \
+            e.text().right_of(element).all()
+        assert c.below(element, 2).all() == e.below(element, 2).all()
+
+    patterns = ["test", "Table", "PDF", "missing"]
+    for regex in [False, True]:
+        for ignore_case in [False, True]:
+            found = c.search_many(patterns, regex, ignore_case)
+            expected = e.search_many(patterns, regex, ignore_case)
+            assert sorted(found) == sorted(expected)
+            for pattern in patterns:
+                assert found[pattern].all() == expected[pattern].all()
+
+    rnd = random.Random(0)
+    for f in ["starts_inside", "ends_inside", "whole_inside"]:
+        for _ in range(50):
+            x1, x2 = sorted(rnd.uniform(0, 600) for _ in range(2))
+            y1, y2 = sorted(rnd.uniform(0, 800) for _ in range(2))
+            flags = [rnd.choice([True, False]) for _ in range(4)]
+            box = BoxQuery(x1, y1, x2, y2, *flags)
+            assert c.inside(box, f).all() == e.inside(box, f).all()
+
+
+def test_element_kind(test_file_2):
+    e = DrunkenChildInTheFog(test_file_2).get_document().everything()
+
+    assert {elem.kind for elem in e.vertical()} == {VERTICAL}
+    assert {elem.kind for elem in e.horizontal()} == {HORIZONTAL}
+    assert {elem.kind for elem in e.text()} == {TEXT}
+
+    # Backwards compatible text of lines
+    assert e.vertical().first().text == VERTICAL_LINE
+    assert e.horizontal().first().text == HORIZONTAL_LINE
+
+    with pytest.raises(AttributeError):
+        e.first().__dict__
+
+
+def test_position_in_long_document():
+    document = Document()
+    for no in range(sys.getrecursionlimit() * 2):
+        page = document.add_page(100, 200)
+        page.add_element(20, 10, 30, 20, "b")
+        page.add_element(10, 10, 20, 20, "a")
+
+    document.sort()
+    pages = document.get_pages()
+    assert pages[-1].position_in_document() == \
+        100 * 100 * 200 * (len(pages) - 1)
+    assert document.offsets[-1] == pages[-1].position_in_document()
+    assert [elem.text for elem in pages[-1].everything()] == ["a", "b"]
+
+    positions = [elem.position_in_document() for elem in document.everything()]
+    assert positions == sorted(positions)
+
+
+def test_defrag_lines():
+    page = Page(100, 100, None)
+    # Chain of horizontal segments, in random order
+    page.add_element(20, 50, 30, 50, HORIZONTAL_LINE)
+    page.add_element(0, 50, 10, 50, HORIZONTAL_LINE)
+    page.add_element(10, 50, 20, 50, HORIZONTAL_LINE)
+    # Same coordinates, but another line
+    page.add_element(30, 40, 40, 40, HORIZONTAL_LINE)
+    # Vertical chain
+    page.add_element(5, 0, 5, 10, VERTICAL_LINE)
+    page.add_element(5, 10, 5, 20, VERTICAL_LINE)
+    # Gap
+    page.add_element(50, 50, 60, 50, HORIZONTAL_LINE)
+    page.add_element(61, 50, 70, 50, HORIZONTAL_LINE)
+    # Overlap
+    page.add_element(0, 10, 50, 10, HORIZONTAL_LINE)
+    page.add_element(20, 10, 70, 10, HORIZONTAL_LINE)
+    page.add_element(0, 10, 50, 10, "text")
+    page.sort_elements()
+
+    assert page.defrag_lines() == 3
+    assert [(e.x1, e.y1, e.x2, e.y2) for e in page.lines()] == [
+        (0, 50, 30, 50),
+        (50, 50, 60, 50),
+        (61, 50, 70, 50),
+        (30, 60, 40, 60),
+        (5, 80, 5, 100),
+        (0, 90, 50, 90),
+        (20, 90, 70, 90),
+    ]
+    assert page.everything().text().count() == 1
+
+    assert page.defrag_lines(tolerance=1) == 1
+    assert page.defrag_lines(overlapping=True) == 1
+    assert [(e.x1, e.y1, e.x2, e.y2) for e in page.horizontal()] == [
+        (0, 50, 30, 50),
+        (50, 50, 70, 50),
+        (30, 60, 40, 60),
+        (0, 90, 70, 90),
+    ]
+
+    # A segment inside of another one does not break the chain.
+    page = Page(100, 100, None)
+    page.add_element(0, 50, 10, 50, HORIZONTAL_LINE)
+    page.add_element(2, 50, 5, 50, HORIZONTAL_LINE)
+    page.add_element(10, 50, 20, 50, HORIZONTAL_LINE)
+    page.sort_elements()
+    assert page.defrag_lines() == 1
+    assert [(e.x1, e.x2) for e in page.lines()] == [(0, 20), (2, 5)]
+    rows = page_rows("f", 1, 100, 100, [
+        (0, 50, 10, 50, HORIZONTAL_LINE), (2, 50, 5, 50, HORIZONTAL_LINE),
+        (10, 50, 20, 50, HORIZONTAL_LINE)])
+    assert [row[2:6] for row in rows] == [(0, 50, 20, 50), (2, 50, 5, 50)]
+
+
+def test_everything_cache():
+    document = Document()
+    page = document.add_page(100, 100)
+    page.add_element(10, 10, 20, 20, "b")
+    page.add_element(0, 10, 10, 20, "a")
+
+    e = document.everything()
+    assert [elem.text for elem in e] == ["a", "b"]
+    assert page.sorted
+    assert document.everything().elements is e.elements
+
+    # Results are copies, changing them does not change the cache.
+    e.all().append(None)
+    document.everything().all().sort(key=lambda elem: elem.text,
+                                     reverse=True)
+    assert [elem.text for elem in document.everything()] == ["a", "b"]
+
+    page.add_element(0, 50, 10, 60, "c")
+    assert not page.sorted
+    assert [elem.text for elem in document.everything()] == ["c", "a", "b"]
+
+    document.add_page(100, 100).add_element(0, 0, 10, 10, "d")
+    assert [elem.text for elem in document.everything()] == \
+        ["c", "a", "b", "d"]
+
+
+class CountingBoxQuery(BoxQuery):
+    calls = 0
+
+    def counting(self, element):
+        self.calls += 1
+        return self.whole_inside(element)
+
+
+def test_element_set_is_lazy(test_file_2):
+    e = DrunkenChildInTheFog(test_file_2).get_document().everything()
+    box = CountingBoxQuery(0, 0, 1000, 1000)
+
+    query = e.inside(box, "counting").text().containing_text("test")
+    assert box.calls == 0
+
+    assert query.first().text == "test"
+    first_calls = box.calls
+    assert first_calls < e.count()
+
+    assert query.count() == len([
+        elem for elem in e.all()
+        if elem.kind == TEXT and "test" in elem.text])
+    assert box.calls == first_calls + e.count()
+
+    # Iteration caches the result
+    assert list(query) == query.all()
+    calls = box.calls
+    assert query.count() == len(query.all())
+    assert query.second() == query.all()[1]
+    assert box.calls == calls
+
+    page = e.first().page
+    query = page.everything().text().inside(BoxQuery(0, 0, 300, 300))
+    assert query.all() == [elem for elem in page.inside(
+        BoxQuery(0, 0, 300, 300)) if elem.kind == TEXT]
+
+
+@pytest.mark.parametrize("casefold", [True, False])
+def test_text_index(test_file_2, casefold):
+    document = DrunkenChildInTheFog(test_file_2).get_document()
+    plain = ElementSet(document.everything().all())
+    page = document.get_pages()[0]
+
+    assert document.text_index() is None
+    document.build_text_index(casefold=casefold)
+    page.build_text_index(casefold=casefold)
+    e = document.everything()
+    assert e.text_index is document.text_index()
+    assert document.everything().text_index is e.text_index
+
+    queries = ["test", "Test", "TEST", "te", "two tables", "tables in",
+               "_line_", "nothing", "t", ""]
+    for query in queries:
+        for ignore_case in [False, True]:
+            expected = plain.containing_text(query, ignore_case).all()
+            assert e.containing_text(query, ignore_case).all() == expected
+            assert page.containing_text(query, ignore_case).all() == \
+                expected
+
+            expected = plain.containing_word(query, ignore_case).all()
+            assert e.containing_word(query, ignore_case).all() == expected
+
+            expected = plain.containing_prefix(query, ignore_case).all()
+            assert e.containing_prefix(query, ignore_case).all() == expected
+
+    assert e.containing_word("tables").count() == 1
+    assert e.containing_prefix("tab").count() == 4
+    assert e.containing_word("table").count() == 3
+    assert e.containing_text("TWO", ignore_case=True).first().text == \
+        "two tables in a PDF ﬁle"
+
+    # Index is built again when the document changes
+    page.add_element(0, 0, 10, 10, "new test")
+    assert document.everything().containing_word("new").count() == 1
+    assert page.containing_text("new").count() == 1
+
+    # Sets taken before the page changes query the current index
+    page = Page(600, 800, None)
+    page.build_text_index(casefold=casefold)
+    for x in range(0, 100, 10):
+        page.add_element(x, 100, x + 10, 100, HORIZONTAL_LINE)
+    page.add_element(0, 500, 50, 510, "total")
+    held = page.everything()
+    assert held.containing_text("total").count() == 1
+    page.add_element(0, 600, 50, 610, "new total")
+    page.sort()
+    assert len(page.elements) == 3
+    assert held.containing_text("total").all() == page.elements[:2]
+
+
+def test_nearest():
+    data = make_pdf(pages=1, text_lines=20, rows=4, columns=4)
+    page = DrunkenChildInTheFog(BytesIO(data)).get_document().get_pages()[0]
+    everything = page.everything()
+    plain = ElementSet(page.elements)
+
+    for element in page.elements[::7]:
+        for direction in (None, "right", "left", "below", "above"):
+            for k in (1, 3, None):
+                for tolerance in (0, 2):
+                    expected = plain.nearest(element, k, direction, tolerance)
+                    found = everything.nearest(element, k, direction,
+                                               tolerance)
+                    assert found.all() == expected.all()
+        assert element.right_of().all() == plain.right_of(element).all()
+        assert everything.text().below(element, 1).all() == \
+            plain.text().below(element, 1).all()
+
+    with pytest.raises(ValueError):
+        everything.nearest(page.elements[0], direction="up")
+
+
+def test_relative_position():
+    page = Page(100, 100, None)
+    for x1, y1, x2, y2, text in [
+            (10, 80, 30, 90, "Label"), (40, 80, 50, 90, "value"),
+            (70, 81, 90, 91, "far"), (10, 60, 30, 70, "under"),
+            (10, 20, 30, 30, "bottom"), (60, 20, 90, 30, "corner")]:
+        page.add_element(x1, y1, x2, y2, text)
+    page.sort()
+    label = page.containing_text("Label").first()
+
+    assert [e.text for e in label.right_of()] == ["value", "far"]
+    assert [e.text for e in label.below()] == ["under", "bottom"]
+    assert label.left_of().count() == label.above().count() == 0
+    assert label.nearest().first().text == "value"
+    assert [e.text for e in label.nearest(k=6)] == [
+        "value", "under", "far", "bottom", "corner"]
+
+    value = page.containing_text("value").first()
+    assert value.below().count() == 0
+    assert [e.text for e in value.below(tolerance=10)] == [
+        "under", "bottom", "corner"]
+
+
+def test_rows_and_columns():
+    page = Page(100, 100, None)
+    for x1, y1, x2, y2, text in [
+            (60, 80, 90, 90, "b1"), (10, 79, 30, 89, "a1"),
+            (10, 60, 30, 70, "a2"), (62, 59, 90, 69, "b2"),
+            (0, 50, 100, 50, HORIZONTAL_LINE), (35, 40, 45, 50, "c3")]:
+        page.add_element(x1, y1, x2, y2, text)
+
+    assert [[e.text for e in row] for row in page.rows()] == [
+        ["a1", "b1"], ["a2", "b2"], ["c3"]]
+    assert [[e.text for e in row] for row in page.rows(tolerance=0)] == [
+        ["b1"], ["a1"], ["a2"], ["b2"], ["c3"]]
+    assert [[e.text for e in column] for column in page.columns()] == [
+        ["a1", "a2"], ["c3"], ["b1", "b2"]]
+    assert [[e.text for e in column]
+            for column in page.columns(align="right")] == [
+        ["a1", "a2"], ["c3"], ["b1", "b2"]]
+    assert page.rows() is not page.rows()
+    assert page._clusters
+    page.rows()[0].all().reverse()
+    assert [e.text for e in page.rows()[0]] == ["a1", "b1"]
+
+    page.add_element(10, 40, 30, 50, "a3")
+    assert not page._clusters
+    assert [e.text for e in page.rows()[2]] == ["a3", "c3"]
+    with pytest.raises(ValueError):
+        page.rows(align="left")
+
+
+def test_search_many(test_file_2):
+    document = DrunkenChildInTheFog(test_file_2).get_document()
+    everything = document.everything().text()
+    patterns = ["tab", "Table", "e", "", "no such text", "ab", "b"]
+
+    for ignore_case in (False, True):
+        found = everything.search_many(patterns, ignore_case=ignore_case)
+        for pattern in patterns:
+            expected = everything.containing_text(pattern, ignore_case)
+            assert found[pattern].all() == expected.all()
+
+    matcher = TextMatcher([r"\d+", r"^tab", "zzz"], regex=True,
+                          ignore_case=True)
+    found = document.search_many(matcher)
+    assert found["zzz"].count() == 0
+    assert found[r"^tab"].all() == [
+        elem for elem in document.everything()
+        if elem.text.lower().startswith("tab")]
+    assert found[r"\d+"].count() > 0
+
+
+def test_text_matcher():
+    matcher = TextMatcher(["he", "she", "his", "hers", "s"])
+    assert sorted(matcher.find("ushers")) == [0, 1, 3, 4]
+    assert matcher.find("xyz") == set()
+    assert sorted(TextMatcher(["abcd", "bc", "c"]).find("abcx")) == [1, 2]
+    assert _Automaton(["he", "she", "his", "hers", "s"]).find("ushers") == \
+        {0, 1, 3, 4}
+    assert _Automaton(["abcd", "bc", "c"]).find("abcx") == {1, 2}
+
+    # Patterns are independent expressions, with their own flags and groups.
+    matcher = TextMatcher(["(?i)total", "(?P<x>a)", "(?P<x>b)", r"(a)x",
+                           r"(b)\1"], regex=True)
+    assert matcher.find("TOTAL") == {0}
+    assert matcher.find("ab") == {1, 2}
+    assert matcher.find("bb") == {2, 4}
+
+    many = ["pattern %d" % no for no in range(100)] + ["he"]
+    matcher = TextMatcher(many, ignore_case=True)
+    assert sorted(matcher.find("Pattern 10 HE")) == [1, 10, 100]
+
+    # A few patterns are found by substring checks, with the same results.
+    few = TextMatcher(many[:AUTOMATON_PATTERNS], ignore_case=True)
+    assert few._automaton is None and matcher._automaton is not None
+    for text in ["Pattern 10 HE", "pattern 49", "xyz", ""]:
+        assert few.find(text) == set(
+            no for no in matcher.find(text) if no < AUTOMATON_PATTERNS)
+
+
+def test_tables(test_file_2):
+    page = DrunkenChildInTheFog(test_file_2).get_document().get_pages()[0]
+    tables = page.tables()
+    assert len(tables) == 2
+
+    first = tables[0]
+    assert (first.row_count, first.column_count) == (5, 4)
+    assert [cell.text for cell in first.rows()[0]] == \
+        ["test", "table", "parsing", "test"]
+    assert first.cell(1, 1).text == "multiple rows in table"
+    assert first.cell(3, 2).elements.count() == 3
+    assert tables[1].cell(0, 0).text == "MORE data below"
+    assert [len(column) for column in tables[1].columns()] == [5, 5, 5, 5]
+
+
+def test_tables_spanning_cells():
+    page = Page(100, 100, None)
+    # 3x3 grid, top row is a single cell, middle cell spans two rows
+    for y in (0, 10, 30):
+        page.add_element(0, 100 - y, 30, 100 - y, HORIZONTAL_LINE)
+    page.add_element(0, 100 - 20, 10, 100 - 20, HORIZONTAL_LINE)
+    page.add_element(20, 100 - 20, 30, 100 - 20, HORIZONTAL_LINE)
+    for x in (0, 10, 20, 30):
+        y1 = 10 if x in (10, 20) else 0
+        page.add_element(x, 100 - 30, x, 100 - y1, VERTICAL_LINE)
+    page.add_element(12, 100 - 28, 18, 100 - 12, "middle")
+    page.add_element(1, 100 - 9, 5, 100 - 1, "top")
+    page.sort()
+
+    table, = page.tables()
+    assert (table.row_count, table.column_count) == (3, 3)
+    assert [(c.row, c.column, c.rowspan, c.colspan) for c in table.cells] == [
+        (0, 0, 1, 3),
+        (1, 0, 1, 1), (1, 1, 2, 1), (1, 2, 1, 1),
+        (2, 0, 1, 1), (2, 2, 1, 1),
+    ]
+    assert table.cell(0, 2).text == "top"
+    assert table.cell(2, 1).text == "middle"
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_cli(tmpdir, workers):
+    broken = tmpdir.join("broken.pdf")
+    broken.write("not a PDF file")
+    output = tmpdir.join("out.jsonl")
+
+    tests = os.path.dirname(__file__)
+    assert cli.main([tests, str(broken), "-o", str(output),
+                     "-j", workers]) == 1
+
+    rows = [json.loads(line) for line in output.readlines()]
+    files = set(row["file"] for row in rows)
+    assert files == {os.path.join(tests, "test.pdf"),
+                     os.path.join(tests, "test2.pdf")}
+    assert {row["kind"] for row in rows} == \
+        {"text", "horizontal_line", "vertical_line"}
+    assert [row["text"] for row in rows
+            if row["file"].endswith("test.pdf")][0] == "Hello World!"
+
+
+def test_cli_csv(tmpdir, test_file):
+    output = tmpdir.join("out.csv")
+    assert cli.main([test_file.name, "-f", "csv", "-o", str(output),
+                     "--pages", "1", "--char-margin", "2"]) == 0
+    assert b"\r\r\n" not in output.read_binary()
+    rows = list(csv.reader(output.open()))
+    assert rows[0] == list(COLUMNS)
+    assert len(rows) == 3
+
+    assert cli.main([test_file.name, "-f", "csv", "-o", str(output),
+                     "--pages", "2-"]) == 0
+    assert len(list(csv.reader(output.open()))) == 1
+
+
+def test_cli_no_layout_analysis(tmpdir, test_file_2):
+    expected = tmpdir.join("expected.csv")
+    output = tmpdir.join("out.csv")
+    assert cli.main([test_file_2.name, "-f", "csv", "-o",
+                     str(expected)]) == 0
+    assert cli.main([test_file_2.name, "-f", "csv", "-o", str(output),
+                     "--no-layout-analysis"]) == 0
+    assert len(output.readlines()) > 1
+    assert output.read() == expected.read()
+
+
+def test_export(tmpdir):
+    data = make_pdf(pages=3, text_lines=5, rows=3, columns=3)
+    document = DrunkenChildInTheFog(BytesIO(data)).get_document()
+    expected = [["f.pdf", page.number, elem.x1, elem.y1, elem.x2, elem.y2,
+                 KIND_NAMES[elem.kind], elem.text if elem.kind == TEXT else ""]
+                for page in document.pages[1:] for elem in page.everything()]
+
+    # Files opened like by the command line tool, on either Python
+    path = str(tmpdir.join("out.jsonl"))
+    with cli.open_output(path) as output:
+        writer = JSONLinesWriter(output)
+        assert export(BytesIO(data), writer, name="f.pdf") == len(expected)
+        writer.close()
+    with open(path) as output:
+        rows = [json.loads(line) for line in output]
+    assert [[row[column] for column in COLUMNS] for row in rows] == expected
+
+    path = str(tmpdir.join("out.csv"))
+    with cli.open_output(path) as output:
+        writer = CSVWriter(output)
+        export(BytesIO(data), writer, name="f.pdf", pages=[-1])
+        writer.close()
+    with open(path) as output:
+        assert len(output.read().splitlines()) == 1 + len(
+            document.get_page(3).everything())
+
+
+def test_export_parquet(tmpdir, test_file_2):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    expected = tmpdir.join("out.jsonl")
+    output = tmpdir.join("out.parquet")
+    assert cli.main([test_file_2.name, "-o", str(expected)]) == 0
+    assert cli.main([test_file_2.name, "-f", "parquet", "-o",
+                     str(output)]) == 0
+
+    table = parquet.read_table(str(output))
+    assert table.column_names == list(COLUMNS)
+    assert table.to_pylist() == \
+        [json.loads(line) for line in expected.readlines()]
+
+
+def test_export_page_rows():
+    rows = page_rows("f", 1, 100, 100, [
+        (20, 50, 30, 50, HORIZONTAL_LINE),
+        (10, 50, 20, 50, HORIZONTAL_LINE),
+        (5, 90, 15, 95, "Title"),
+    ])
+    assert rows == [("f", 1, 5, 5, 15, 10, "text", "Title"),
+                    ("f", 1, 10, 50, 30, 50, "horizontal_line", "")]
+
+
+def test_template():
+    document = Document()
+    for number in (1, 2, 3):
+        page = document.add_page(100, 100)
+        # Text elements are added in PDF coordinates, y grows upwards.
+        page.add_element(10, 90, 30, 95, "No:")
+        page.add_element(40, 90, 60, 95, "A%d" % number)
+        page.add_element(10, 50, 30, 55, "Total")
+        page.add_element(40, 50, 60, 55, "%d00" % number)
+        page.add_element(10, 45, 90, 45, HORIZONTAL_LINE)
+        page.sort()
+
+    template = Template([
+        Region("number", BoxQuery(35, 0, 65, 20), page=1),
+        Anchor("total", "total", ignore_case=True),
+        Anchor("last_total", "Total", page=3),
+        Anchor("below", "No:", direction="below", k=None, page=2),
+    ])
+    found = template.apply(document)
+    assert [elem.text for elem in found["number"]] == ["A1"]
+    assert [elem.text for elem in found["total"]] == ["100", "200", "300"]
+    assert [elem.text for elem in found["last_total"]] == ["300"]
+    assert [elem.text for elem in found["below"]] == ["Total"]
+
+    template = Template([Region("number", BoxQuery(35, 0, 65, 20), page=2)])
+    assert template.pages == [2]
+    assert template.apply(document)["number"].first().text == "A2"
+
+    with pytest.raises(ValueError):
+        Template([Anchor("a", "x"), Anchor("a", "y")])
+    with pytest.raises(ValueError):
+        Anchor("a", "x", direction="up")
+
+
+def test_template_extract():
+    data = make_pdf(pages=3, text_lines=2, rows=2, columns=2)
+    document = DrunkenChildInTheFog(BytesIO(data)).get_document()
+    text = document.get_page(2).everything().text().first()
+    box = BoxQuery(text.x1, text.y1, text.x2, text.y2)
+    template = Template([Region("first", box, page=2)])
+
+    stats = ParseStats()
+    found = template.extract(DrunkenChildInTheFog(BytesIO(data), stats=stats))
+    assert [elem.text for elem in found["first"]] == [text.text]
+    assert [page.number for page in stats.pages] == [2]